@@ -1,38 +1,10 @@
-from random import randint
-from ast import literal_eval
+from breed_population import breed_population
 
-from duplicate_pairs import duplicate_pairs
-from mix_dna import mix_dna
-from mutate_dna import mutate_dna
-from reduct_pairs import reduct_pairs
 
-import settings as S
-
-
-def ascend_dna(generation_top_scores, generation):
+def ascend_dna(population, generation_top_scores, rng=None):
     """
-    param: Ascends the DNA to the next generation.
-    type: list[[int, int]], int
-    return: None
+    param: Ascends the DNA to the next generation: one child per selected parent, bred by breed_population.
+    type: list[Genome], list[int], numpy.random.Generator
+    return: list[Genome], list[int] (crossover donor of every child, -1 for none)
     """
-    loop_index = 0
-    for current_gen_index in generation_top_scores:
-        with open(S.GEN_FOLDER + str(generation) + '/dna_' + str(current_gen_index), 'r') as dna_file:
-            tmp_dna = literal_eval(dna_file.read())
-        dna_file.close()
-        if randint(1, 100) <= S.DNA_MUTATION_RATE:
-            mutate_dna(tmp_dna)
-        if randint(1, 100) <= S.DNA_DUPLICATION_RATE:
-            duplicate_pairs(tmp_dna)
-        if randint(1, 100) <= S.DNA_REDUCTION_RATE:
-            reduct_pairs(tmp_dna)
-        if randint(1, 100) <= S.DNA_MIX_RATE:
-            while True:
-                index_to_mix = generation_top_scores[randint(0, len(generation_top_scores) - 1)]
-                if index_to_mix != current_gen_index:
-                    break
-            mix_dna(tmp_dna, index_to_mix, generation)
-        with open(S.GEN_FOLDER + str(generation + 1) + '/dna_' + str(loop_index), 'w') as dna_file:
-            dna_file.write(str(tmp_dna))
-        dna_file.close()
-        loop_index += 1
+    return breed_population(population, generation_top_scores, rng)
@@ -0,0 +1,67 @@
+from math import log
+
+from numpy import array, clip, int64, mean, ones, sort
+
+from create_sets import create_sets
+from random_streams import use_stream
+from shared_population import read_genome, write_scores
+from test_index import get_test_index
+import settings as S
+
+
+def assess_sets(sets, test_index=None):
+    """
+    param: Scores every line of a sets matrix at once, giving the same numbers as assess_set_line on each line.
+    type: numpy.ndarray (int, lines x digits), numpy.ndarray
+    return: numpy.ndarray (int, lines)
+    """
+    if test_index is None:
+        test_index = get_test_index()
+    sets = sort(sets, axis=1)
+    unique = ones(sets.shape, dtype=bool)
+    unique[:, 1:] = sets[:, 1:] != sets[:, :-1]
+    in_range = unique & (sets >= S.MINIMUM_DIGIT) & (sets <= S.MAXIMUM_DIGIT)
+    raw_scores = (test_index[clip(sets, 0, S.MAXIMUM_DIGIT)] * in_range).sum(axis=1)
+    # Same uniqueness bias as assess_set_line, taken from math.log so the truncation lands on the same integers.
+    bias = array([log(count + 1, S.SET_LENGTH) for count in range(sets.shape[1] + 1)])
+    return (raw_scores * bias[unique.sum(axis=1)]).astype(int64)
+
+
+def mean_score(set_scores):
+    """
+    param: The score of a member: the mean of its set scores, rounded down, 0 when there are none.
+    type: numpy.ndarray
+    return: int
+    """
+    try:
+        return int(mean(set_scores))
+    except (TypeError, ValueError):
+        return 0
+
+
+def assess_member(dna, member, keep_sets=False, size=None, seed=None):
+    """
+    param: Worker task that creates the sets of a member (SET_SIZE of them unless told otherwise) from the task's
+    own seed and scores them. The sets themselves are only sent back when they are going to be written to a checkpoint.
+    type: list[str,...,[int]] or Genome, int, bool, int, numpy.random.SeedSequence
+    return: int, numpy.ndarray, numpy.ndarray or None
+    """
+    use_stream(seed)
+    if not S.QUIET:
+        print("Assessing sets for member: " + str(member + 1))
+    sets = create_sets(dna, size)
+    set_scores = assess_sets(sets)
+    return mean_score(set_scores), set_scores, sets if keep_sets else None
+
+
+def assess_stored(name, member, column, size, keep_sets=False, seed=None):
+    """
+    param: Worker task like assess_member, for a member of the shared population: the genome is read from the
+    block and its set scores are written into the member's row from column on, so only the sets (when they are
+    kept) travel back.
+    type: str, int, int, int, bool, numpy.random.SeedSequence
+    return: numpy.ndarray or None
+    """
+    score, set_scores, sets = assess_member(read_genome(name, member), member, keep_sets, size, seed)
+    write_scores(name, member, column, set_scores)
+    return sets
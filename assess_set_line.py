@@ -1,23 +1,21 @@
 from math import log
 
+from test_index import get_test_index
 import settings as S
 
 
-def assess_set_line(sum_set):
+def assess_set_line(sum_set, test_index=None):
     """
-    param: Assesses a set against the sets in the test file.
-    type: set(list)
+    param: Assesses a set against the sets in the test file, using the test index (see test_index.py).
+    type: set(list), numpy.ndarray
     return: int
     """
+    if test_index is None:
+        test_index = get_test_index()
     score = 0
-    with open(S.TEST_FILE, 'r') as test_file:
-        
-        for test_set in test_file:
-            for digit in sum_set:
-                if int(digit) >= S.MINIMUM_DIGIT and int(digit) <= S.MAXIMUM_DIGIT:
-                    if digit in test_set:
-                        score += 1
-    test_file.close()
+    for digit in sum_set:
+        if int(digit) >= S.MINIMUM_DIGIT and int(digit) <= S.MAXIMUM_DIGIT:
+            score += int(test_index[int(digit)])
     # Adding a bias here that the score will be lower if the set had low uniqueness.
     score = score * log(len(sum_set) + 1, S.SET_LENGTH)
     return int(score)
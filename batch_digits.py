@@ -0,0 +1,134 @@
+from numpy import array, asarray, float64, int64, rint, zeros
+
+from compile_dna import compile_expression
+from fold_dna import evaluate_folded, fold_plan
+from genome import as_dna, is_letter
+from random_streams import get_stream
+import settings as S
+
+# Above this magnitude float64 stops holding every integer exactly, so the columns could drift from eval.
+EXACT_LIMIT = 2 ** 53
+
+
+def plan_dna(dna):
+    """
+    param: Splits a well-formed DNA into its '+'/'-' terms of '*'/'/' factors so it can be evaluated column-wise.
+    A factor is either a constant letter or a key slot (the column of the drawn letters it reads from).
+    Returns None when the DNA is not a clean letter/operator alternation or could outgrow exact float64 maths.
+    type: list[str,...,[int]] or Genome
+    return: list[[str, [[str, bool, int]]]] or None
+    """
+    dna = as_dna(dna)
+    tokens = dna[:-1]
+    key = dna[-1]
+    if len(tokens) % 2 == 0:
+        return None
+    for index, token in enumerate(tokens):
+        if index % 2 == 0 and not is_letter(token):
+            return None
+        if index % 2 == 1 and token not in S.OPERATORS:
+            return None
+    slots = {}
+    for column, index in enumerate(key):
+        if index < 0 or index >= len(tokens) or index % 2 == 1:
+            return None
+        slots[index] = column  # Letters go in in key order, so a repeated index keeps the last letter drawn for it.
+    plan = []
+    operator = '+'
+    factors = []
+    bound = 0
+    term_bound = 0
+    for index in range(0, len(tokens), 2):
+        if index > 0:
+            operator = tokens[index - 1]
+        if index in slots:
+            # eval raises ZeroDivisionError where numpy would quietly give inf, leave those to the slow path.
+            if operator == '/' and S.MINIMUM_LETTER_VALUE <= 0 <= S.MAXIMUM_LETTER_VALUE:
+                return None
+            factor = [operator, True, slots[index]]
+            largest = max(abs(S.MINIMUM_LETTER_VALUE), abs(S.MAXIMUM_LETTER_VALUE))
+        else:
+            if operator == '/' and tokens[index] == '0':
+                return None
+            factor = [operator, False, int(tokens[index])]
+            largest = int(tokens[index])
+        if operator in '+-' and index > 0:
+            plan.append([factors[0][0], factors])
+            bound += term_bound
+            factors = []
+        if operator in '+-':
+            factor[0] = operator
+            term_bound = largest
+        elif operator == '*':
+            term_bound *= largest
+        factors.append(factor)
+    plan.append([factors[0][0], factors])
+    bound += term_bound
+    if bound > EXACT_LIMIT:
+        return None
+    return plan
+
+
+def evaluate_plan(plan, letters):
+    """
+    param: Evaluates a planned DNA for every row of drawn key letters, term by term, in the same order as eval.
+    type: list, numpy.ndarray (samples x keys)
+    return: numpy.ndarray (float, samples)
+    """
+    letters = asarray(letters, dtype=float64)
+    total = None
+    for sign, factors in plan:
+        term = None
+        for operator, is_slot, value in factors:
+            factor = letters[..., value] if is_slot else float(value)
+            if term is None:
+                term = factor
+            elif operator == '*':
+                term = term * factor
+            else:
+                term = term / factor
+        if total is None:
+            total = term if sign == '+' else -term
+        elif sign == '+':
+            total = total + term
+        else:
+            total = total - term
+    # A DNA without key slots gives a scalar, spread it over every sample.
+    return total + zeros(letters.shape[:-1])
+
+
+def compile_batch(dna):
+    """
+    param: Plans and folds a DNA once and returns a function that draws and evaluates `size` digits per call, for
+    callers that evaluate the same DNA in several batches.
+    type: list[str,...,[int]] or Genome
+    return: function(size, rng=None) -> numpy.ndarray (int, size)
+    """
+    dna = as_dna(dna)
+    key = dna[-1]
+    plan = plan_dna(dna)
+    folded = None if plan is None else fold_plan(plan)
+    expression = compile_expression(dna) if plan is None else None
+
+    def evaluate(size, rng=None):
+        if rng is None:
+            rng = get_stream().generator
+        if isinstance(size, int):
+            size = (size,)
+        letters = rng.integers(S.MINIMUM_LETTER_VALUE, S.MAXIMUM_LETTER_VALUE, size=tuple(size) + (len(key),),
+                               endpoint=True)
+        if folded is not None:
+            return rint(evaluate_folded(folded, letters)).astype(int64)
+        rows = letters.reshape(-1, len(key)).tolist()
+        return array([round(expression(*row)) for row in rows]).reshape(size)
+    return evaluate
+
+
+def batch_digits(dna, size, rng=None):
+    """
+    param: Draws all key letters of a DNA at once as a (size x keys) array and returns the rounded digits,
+    matching eval of the DNA for every draw. DNAs that can't be planned are evaluated row by row.
+    type: list[str,...,[int]] or Genome, int or tuple, numpy.random.Generator
+    return: numpy.ndarray (int, size)
+    """
+    return compile_batch(dna)(size, rng)
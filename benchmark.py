@@ -0,0 +1,268 @@
+#!/usr/bin/python
+
+from contextlib import contextmanager, redirect_stdout
+from io import StringIO
+from json import dump, load
+from os import path
+from platform import python_version
+from statistics import median
+from sys import argv, exit
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from numpy import __version__ as numpy_version
+
+import settings as S
+from random_streams import RandomStream, get_stream, use_stream
+
+"""
+Benchmarks of the evolution hot paths. Every benchmark runs from a fixed seed on synthetic test files made by
+generate_testfile.py, for several test file sizes, POPULATION_SIZE and SET_SIZE values. The results are written
+to a JSON file, which can be kept as a baseline and compared against later.
+"""
+
+HELP = ("Usage: python benchmark.py [--output=<results file>]\n"
+        "OPTIONAL: --quick (smaller sizes and fewer repeats)\n"
+        "          --compare=<baseline file> (flag the benchmarks that got slower than the baseline)\n"
+        "          --results=<results file> (with --compare: compare these results instead of running again)\n"
+        "          --tolerance=<percent> (how much slower counts as a regression, default 10)")
+
+BENCHMARK_SEED = 1234
+BENCHMARK_VERSION = 1
+TEST_LINES = (100, 1000, 10000)
+POPULATION_SIZES = (20, 100)
+SET_SIZES = (200, 2000)
+REPEATS = 5
+TOLERANCE = 10
+
+
+@contextmanager
+def overridden(**values):
+    """
+    param: Changes settings for the length of a with block, e.g. overridden(SET_SIZE=200).
+    type: any
+    return: None
+    """
+    old_values = {name: getattr(S, name) for name in values}
+    for name, value in values.items():
+        setattr(S, name, value)
+    try:
+        yield
+    finally:
+        for name, value in old_values.items():
+            setattr(S, name, value)
+
+
+def set_sizes(set_size):
+    """
+    param: SET_SIZE with a SET_HEALTH that keeps the proportion of the settings file.
+    type: int
+    return: dict
+    """
+    return {'SET_SIZE': set_size, 'SET_HEALTH': set_size * S.SET_HEALTH // S.SET_SIZE}
+
+
+def sample_dnas(count, seed=BENCHMARK_SEED):
+    """
+    param: The same healthy DNAs on every run.
+    type: int, int
+    return: list[list[str,...,[int]]]
+    """
+    from get_dna import get_dna
+    use_stream(seed)
+    with redirect_stdout(StringIO()):
+        return [get_dna(member) for member in range(count)]
+
+
+def measure(name, params, run, repeats):
+    """
+    param: Times run() `repeats` times, every time from the same seed.
+    type: str, dict, function, int
+    return: dict
+    """
+    times = []
+    with redirect_stdout(StringIO()):
+        for repeat in range(repeats):
+            use_stream(BENCHMARK_SEED)
+            start = perf_counter()
+            run()
+            times.append(perf_counter() - start)
+    result = {'name': name, 'params': params, 'best': min(times), 'median': median(times), 'repeats': repeats}
+    print(name + " " + str(params) + ": " + format(result['best'], '.6f') + " seconds")
+    return result
+
+
+def run_benchmarks(folder, quick=False):
+    """
+    param: Runs every benchmark, with its test files in folder.
+    type: str, bool
+    return: list[dict]
+    """
+    from ascend_dna import ascend_dna
+    from assess_set_line import assess_set_line
+    from batch_digits import compile_batch
+    from compile_dna import compile_dna
+    from create_sets import create_sets
+    from dna_distribution import compile_distribution, sample_distribution
+    from generate_testfile import generate_testfile
+    from genome import Genome
+    from get_dna import get_dna
+    from get_top_scores import get_top_scores
+    from is_valid import is_valid
+    from test_index import load_test_index
+
+    repeats = 2 if quick else REPEATS
+    test_lines = TEST_LINES[:2] if quick else TEST_LINES
+    population_sizes = POPULATION_SIZES[:1] if quick else POPULATION_SIZES
+    all_set_sizes = SET_SIZES[:1] if quick else SET_SIZES
+    results = []
+    test_files = {}
+    for lines in test_lines:
+        test_files[lines] = path.join(folder, 'test-' + str(lines) + '.csv')
+        generate_testfile(test_files[lines], lines, BENCHMARK_SEED)
+
+    dnas = sample_dnas(4)
+    # The evaluators the pipeline runs, building them and drawing from them measured apart.
+    results.append(measure('compile_dna', {'dnas': 4}, lambda: [compile_dna(dna) for dna in dnas], repeats))
+    evaluators = [compile_dna(dna) for dna in dnas]
+    results.append(measure('compiled_digit', {'calls': 1000},
+                           lambda: [evaluate() for i in range(250) for evaluate in evaluators], repeats))
+    results.append(measure('compile_batch', {'dnas': 4}, lambda: [compile_batch(dna) for dna in dnas], repeats))
+    batches = [compile_batch(dna) for dna in dnas]
+    results.append(measure('compile_distribution', {'dnas': 4}, lambda: [compile_distribution(dna) for dna in dnas],
+                           repeats))
+    distributions = [distribution for distribution in map(compile_distribution, dnas) if distribution is not None]
+    for set_size in all_set_sizes:
+        with overridden(**set_sizes(set_size)):
+            params = {'set_size': set_size}
+            size = (set_size, S.SET_LENGTH)
+            results.append(measure('batch_digits', dict(params, dnas=4),
+                                   lambda: [evaluate(size) for evaluate in batches], repeats))
+            results.append(measure('sample_distribution', dict(params, dnas=len(distributions)),
+                                   lambda: [sample_distribution(distribution, size, get_stream().generator)
+                                            for distribution in distributions], repeats))
+            results.append(measure('is_valid', params, lambda: [is_valid(dna) for dna in dnas], repeats))
+            results.append(measure('get_dna', dict(params, dnas=4),
+                                   lambda: [get_dna(member) for member in range(4)], repeats))
+            results.append(measure('create_sets', params, lambda: [create_sets(dna) for dna in dnas], repeats))
+
+    for lines, test_file in test_files.items():
+        results.append(measure('load_test_index', {'test_lines': lines}, lambda: load_test_index(test_file),
+                               repeats))
+        test_index = load_test_index(test_file)
+        sets = [set(line) for line in RandomStream(BENCHMARK_SEED).generator.integers(
+            S.MINIMUM_DIGIT, S.MAXIMUM_DIGIT, size=(1000, S.SET_LENGTH), endpoint=True).tolist()]
+        results.append(measure('assess_set_line', {'test_lines': lines, 'lines': len(sets)},
+                               lambda: [assess_set_line(line, test_index) for line in sets], repeats))
+
+    for population_size in population_sizes:
+        params = {'population_size': population_size}
+        scores = RandomStream(BENCHMARK_SEED).generator.integers(0, 3000, size=population_size).tolist()
+        results.append(measure('get_top_scores', params, lambda: [get_top_scores(scores) for i in range(100)],
+                               repeats))
+        population = [Genome.from_dna(dnas[member % len(dnas)]) for member in range(population_size)]
+        with overridden(POPULATION_SIZE=population_size):
+            parents = get_top_scores(scores)
+            results.append(measure('ascend_dna', params, lambda: ascend_dna(population, parents), repeats))
+
+    for population_size in population_sizes:
+        for set_size in all_set_sizes:
+            results.append(benchmark_generation(folder, test_files[test_lines[-1]], population_size, set_size,
+                                                repeats))
+    return results
+
+
+def benchmark_generation(folder, test_file, population_size, set_size, repeats):
+    """
+    param: Times a whole one-generation run of better.py (pool start, gen-0, assessing, history, checkpoint and
+    breeding the next generation), writing its files to folder.
+    type: str, str, int, int, int
+    return: dict
+    """
+    with overridden(TEST_FILE=test_file, POPULATION_SIZE=population_size, GENERATIONS=1, SEED=BENCHMARK_SEED,
+                    HISTORY_FILE=path.join(folder, 'history.bin'),
+                    CHECKPOINT_FOLDER=path.join(folder, 'checkpoints'), FITNESS_CACHE_FILE=None,
+                    **set_sizes(set_size)):
+        from better import evolve
+        return measure('generation', {'population_size': population_size, 'set_size': set_size}, evolve,
+                       repeats)
+
+
+def result_key(result):
+    """
+    param: What a result is matched on between two result files.
+    type: dict
+    return: str
+    """
+    return result['name'] + ' ' + ','.join(name + '=' + str(value) for name, value in sorted(result['params'].items()))
+
+
+def compare_results(baseline, results, tolerance=TOLERANCE):
+    """
+    param: Compares the best time of every benchmark to the baseline and prints how it changed.
+    type: dict, dict, float (percent)
+    return: list[str] (the benchmarks that got more than tolerance percent slower)
+    """
+    baseline_times = {result_key(result): result['best'] for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        key = result_key(result)
+        if key not in baseline_times:
+            print(key + ": not in the baseline")
+            continue
+        change = (result['best'] / baseline_times[key] - 1) * 100
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(key + ": " + format(baseline_times[key], '.6f') + " -> " + format(result['best'], '.6f') +
+              " seconds (" + format(change, '+.1f') + "%)" + flag)
+    return regressions
+
+
+def main():
+    """
+    param: Runs the benchmarks and writes the results, or compares results to a baseline.
+    Exits with 1 when a regression was found.
+    type: None
+    return: None
+    """
+    output = 'benchmark.json'
+    baseline_file = None
+    results_file = None
+    tolerance = TOLERANCE
+    for arg in argv[1:]:
+        if "--output=" in arg:
+            output = arg.split("=")[1]
+        elif "--compare=" in arg:
+            baseline_file = arg.split("=")[1]
+        elif "--results=" in arg:
+            results_file = arg.split("=")[1]
+        elif "--tolerance=" in arg:
+            tolerance = float(arg.split("=")[1])
+        elif arg != "--quick":
+            print(HELP)
+            return
+
+    if results_file is not None:
+        with open(results_file) as results_handle:
+            results = load(results_handle)
+    else:
+        with TemporaryDirectory() as folder:
+            results = {'version': BENCHMARK_VERSION, 'python': python_version(), 'numpy': numpy_version,
+                       'seed': BENCHMARK_SEED, 'results': run_benchmarks(folder, "--quick" in argv[1:])}
+        with open(output, 'w') as output_handle:
+            dump(results, output_handle, indent=1)
+        print("Results were written to " + output)
+
+    if baseline_file is not None:
+        with open(baseline_file) as baseline_handle:
+            regressions = compare_results(load(baseline_handle), results, tolerance)
+        if regressions:
+            print(str(len(regressions)) + " benchmarks got slower than the baseline.")
+            exit(1)
+        print("No regressions.")
+
+
+if __name__ == '__main__':
+    main()
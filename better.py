@@ -1,118 +1,265 @@
 #!/usr/bin/python
 
-from multiprocessing import Pool
-from numpy import mean
-from os import path
-from sys import exit
+from multiprocessing import Pool, Process
+from numpy import mean, stack
+from os import path, remove
+from sys import argv, exit
 from time import time
 
 import settings as S
 from core_count import core_count
+from checkpoint import find_checkpoint, save_checkpoint
+from evaluate_population import evaluate_population
+from fitness_cache import FitnessCache
 from ascend_dna import ascend_dna
-from assess_set_line import assess_set_line
-from create_folder import create_folder
-from create_sets import create_sets
 from generate_member import generate_member
 from get_top_scores import get_top_scores
+from metrics import Metrics, SamplingProfiler
+from islands import IslandLink, island_file, is_loopback, parse_address, run_coordinator, shared_authkey
+from random_streams import RandomStreams
+from schedule_tasks import Scheduler, task_features
+from select_parents import select_parents
+from shared_population import SharedPopulation
+from test_index import get_test_index, share_test_index
+from run_history import append_generation
+
+HELP = ("Usage: python better.py\nOPTIONAL: --resume (continue from the newest checkpoint in CHECKPOINT_FOLDER)\n"
+        "          --seed=<integer> (seed the run, the same seed and settings give the same run)\n"
+        "          --quiet (no line for every member)\n"
+        "          --metrics=<file> (write the stages and counters of every generation to the file)\n"
+        "          --profile=<generation> (sample the call stacks of one generation into PROFILE_FILE)\n"
+        "          --islands=<number of islands> (evolve that many populations on this host)\n"
+        "          --island=<island number> --coordinator=<host:port> (join a coordinator as one island)\n"
+        "          --islands=<number of islands> --coordinator=<host:port> --serve (only run the coordinator)\n"
+        "          --authkey=<key> (the key islands and their coordinator share, BETTER_ISLAND_AUTHKEY by default)")
 
 if not path.exists(S.TEST_FILE):
     print("Test file not found.")
     exit(1)
 
 
+def generate_members(scheduler, members, streams, generation):
+    """
+    param: Generates a new random DNA for each of the members of a generation, each from its own seed.
+    type: Scheduler, range, RandomStreams, int
+    return: list[Genome]
+    """
+    tasks = [(member, streams.task_seed('generate', generation, member)) for member in members]
+    return scheduler.map('generate', generate_member, tasks, [task_features()] * len(tasks))
+
+
+def next_generation(scheduler, population, dna_scores, streams, generation, metrics):
+    """
+    param: Selects the parents of an assessed generation, breeds them and completes the next generation (number
+    generation) with new random DNAs.
+    type: Scheduler, list[Genome], list[int], RandomStreams, int, Metrics
+    return: list[Genome] (next generation), list[int] (parents), list[int] (crossover donors), -1 for none
+    """
+    with metrics.stage('breed'):
+        generation_top_scores = select_parents(dna_scores, rng=streams.generator)
+        print("Ascending top DNAs to the next generation.")
+        next_population, donors = ascend_dna(population, generation_top_scores, streams.generator)
+    print("Completing the next generation with new random DNAs.")
+    start = time()
+    new_members = S.POPULATION_SIZE - len(next_population)
+    with metrics.stage('generate'):
+        next_population += generate_members(scheduler, range(len(next_population), S.POPULATION_SIZE), streams,
+                                            generation)
+    print("Completing next generation took " + str(time()-start) + " seconds.")
+    return next_population, generation_top_scores + [-1] * new_members, donors + [-1] * new_members
+
+
+def kept_sets(dna_scores, results):
+    """
+    param: Picks the raw sets the run history keeps for a generation under HISTORY_SETS: none, the top member's
+    or every member's, as long as they were fully created in this generation.
+    type: list[int], list
+    return: list[int] (members), numpy.ndarray (int, members x lines x digits) or None
+    """
+    if S.HISTORY_SETS == 'best':
+        members = [max(range(len(dna_scores)), key=lambda member: dna_scores[member])]
+    elif S.HISTORY_SETS == 'all':
+        members = list(range(len(dna_scores)))
+    else:
+        return [], None
+    members = [member for member in members if results[member] is not None and results[member][2] is not None and
+               results[member][2].shape == (S.SET_SIZE, S.SET_LENGTH)]
+    if not members:
+        return [], None
+    return members, stack([results[member][2] for member in members])
+
+
+def evolve(resume=False, processes=None, link=None, island=None):
+    """
+    param: Evolves one population: creates "healthy" DNAs for gen-0, gen-1+ will be generated from gen-0.
+    One worker pool lives for the whole run and the population stays in memory between the stages, the generation
+    being assessed is also published to shared memory for the workers;
+    every generation is appended to the run history (HISTORY_FILE). Every assessed generation is also saved to
+    CHECKPOINT_FOLDER, which is where resume picks up from. In island mode, the link joins the coordinator once
+    the first generation is known and swaps migrants every MIGRATION_EVERY generations; the migrants that arrive
+    replace the newest members of the next generation.
+    All randomness comes from streams spawned from SEED, islands get streams of their own.
+    The stages and counters of every generation go to METRICS_FILE, and PROFILE_GENERATION is profiled.
+    type: bool, int, IslandLink, int
+    return: None
+    """
+    streams = RandomStreams(S.SEED, island)
+    # The test file is indexed once here and shared read-only with the workers.
+    test_index = get_test_index()
+    fitness_cache = FitnessCache()
+    metrics = Metrics()
+    profiler = SamplingProfiler()
+    processes = core_count() if processes is None else processes
+    with SharedPopulation() as store, \
+            Pool(processes=processes, initializer=share_test_index, initargs=(test_index,)) as pool:
+        scheduler = Scheduler(pool, processes)
+        resumed = find_checkpoint(streams, fitness_cache) if resume else None
+        if resumed is None:
+            # Create the first generation.
+            print("Creating members for generation 0")
+            with metrics.stage('generate'):
+                population = generate_members(scheduler, range(S.POPULATION_SIZE), streams, 0)
+            print("Generation 0 was created in " + str(metrics.wall('generate')) + " seconds.")
+            parents = donors = [-1] * S.POPULATION_SIZE
+            first_generation = 0
+            if path.exists(S.HISTORY_FILE):
+                remove(S.HISTORY_FILE)
+        else:
+            generation, population, dna_scores = resumed
+            print("Resuming after generation " + str(generation))
+            first_generation = generation + 1
+            population, parents, donors = next_generation(scheduler, population, dna_scores, streams,
+                                                          first_generation, metrics)
+        if link is not None:
+            link.join(first_generation)
+        # Assess each generation, get the healthiest DNAs and create the next generation.
+        for generation in range(first_generation, S.GENERATIONS):
+            gen_time = time()
+            if generation == S.PROFILE_GENERATION:
+                profiler.start()
+                scheduler.profile = profiler.interval
+            print("Working in generation: " + str(generation))
+            keep_sets = S.HISTORY_SETS != 'none' and (generation % S.HISTORY_SETS_EVERY == 0 or
+                                                      generation == S.GENERATIONS - 1)
+            # Create the sets for each DNA and assess them.
+            print("Creating and assessing sets for generation " + str(generation))
+            with metrics.stage('evaluate'):
+                store.publish(population)
+                dna_scores, stats, results, assessed, cache_hits = evaluate_population(
+                    scheduler, population, fitness_cache, keep_sets, streams, generation, store)
+            print("Creating and assessing sets took " + str(metrics.wall('evaluate')) + " seconds, " +
+                  str(cache_hits) + " members were in the fitness cache.")
+            print("Assessed " + str(assessed) + " sets, saved " + str(len(population) * S.SET_SIZE - assessed) +
+                  " set evaluations.")
+            print("Top score: " + str(max(dna_scores)) + " Average score: " + str(mean(dna_scores)))
+            with metrics.stage('save'):
+                append_generation(generation, population, stats, parents, donors, *kept_sets(dna_scores, results))
+                save_checkpoint(generation, population, dna_scores, streams, fitness_cache)
+                fitness_cache.save()
+            print("Saving history and checkpoint took " + str(metrics.wall('save')) + " seconds.")
+            migrants = []
+            if link is not None and (generation + 1) % S.MIGRATION_EVERY == 0:
+                with metrics.stage('migrate'):
+                    migrants = [population[member] for member in get_top_scores(dna_scores, S.MIGRANTS)]
+                    migrants = link.exchange(generation, migrants)[:len(population)]
+                print("Received " + str(len(migrants)) + " migrants.")
+            population, parents, donors = next_generation(scheduler, population, dna_scores, streams,
+                                                          generation + 1, metrics)
+            if migrants:
+                population[-len(migrants):] = migrants
+                parents[-len(migrants):] = donors[-len(migrants):] = [-1] * len(migrants)
+            if generation == S.PROFILE_GENERATION:
+                profiler.stop()
+                scheduler.profile = None
+                profiler.save(S.PROFILE_FILE, scheduler.samples)
+                print("Profile of generation " + str(generation) + " was written to " + S.PROFILE_FILE)
+            metrics.end_generation(generation)
+            print("Generation " + str(generation) + " took " + str(time()-gen_time) + " seconds.")
+        # The last generation is never assessed, but keep its DNAs in the history as well.
+        append_generation(S.GENERATIONS, population, None, parents, donors)
+        fitness_cache.save()
+
+
+def run_island(island, address, resume=False, processes=None):
+    """
+    param: Evolves one island: its own population, history and checkpoints, swapping migrants through the
+    coordinator at address.
+    type: int, (str, int), bool, int
+    return: None
+    """
+    S.HISTORY_FILE = island_file(S.HISTORY_FILE, island)
+    S.CHECKPOINT_FOLDER = island_file(S.CHECKPOINT_FOLDER, island)
+    S.PROFILE_FILE = island_file(S.PROFILE_FILE, island)
+    if S.FITNESS_CACHE_FILE:
+        S.FITNESS_CACHE_FILE = island_file(S.FITNESS_CACHE_FILE, island)
+    if S.METRICS_FILE:
+        S.METRICS_FILE = island_file(S.METRICS_FILE, island)
+    link = IslandLink(address, island)
+    try:
+        evolve(resume, processes, link, island)
+    finally:
+        link.leave()
+
+
 def main():
     """
-    param: Main function, creates "healthy" DNAs for gen-0 and their files. gen-1+ will be generated from gen-0.
-    Calculating stuff happens elsewhere.
+    param: Main function, reads the command line and evolves one population, or runs island mode: a coordinator
+    and N islands on this host, one island of a coordinator elsewhere, or only a coordinator.
     type: None
     return: None
     """
-    CORE_COUNT = core_count()
-    # Create the first generation.
-    gen_folder = create_folder(S.GEN_FOLDER, 0)
-    print("Creating members for generation 0")
-    start = time()
-    pool = Pool(processes=CORE_COUNT)
-    member = 0
-    for member in range(S.POPULATION_SIZE):
-        pool.apply_async(generate_member, args=(member, gen_folder))
-    pool.close()
-    pool.join()
-    print("Generation 0 was created in " + str(time()-start) + " seconds.")
-    # Assess each generation, get the healthiest DNAs and create the next generation.
-    for generation in range(S.GENERATIONS):
-        gen_time = time()
-        print("Working in generation: " + str(generation))
-        # Create the sets for each DNA.
-        print("Creating sets for generation " + str(generation))
-        start = time()
-        pool = Pool(processes=CORE_COUNT)
-        member = 0
-        for member in range(S.POPULATION_SIZE):
-            pool.apply_async(create_sets, args=(generation, member,))
-        pool.close()
-        pool.join()
-        print("Creating sets took " + str(time()-start) + " seconds.")
-        # Assess the sets and get the top scores.
-        print("Assessing the sets and getting the top performers.")
-        generation_top_scores = []
-        current_gen_folder = gen_folder
-        next_gen_folder = create_folder(S.GEN_FOLDER, generation + 1)
-        gen_folder = next_gen_folder
-        dna_scores = []
-        start = time()
-
-        for current_sets_file_index in range(S.POPULATION_SIZE):
-            sets_file_path = current_gen_folder + '/dna_' + str(current_sets_file_index) + '_sets'
-            scores_file_path = current_gen_folder + '/dna_' + str(current_sets_file_index) + '_scores'
-            mean_file_path = current_gen_folder + '/dna_' + str(current_sets_file_index) + '_mean'
-            with open(sets_file_path, 'r') as sets_file:
-                print("Assessing sets for member: " + str(current_sets_file_index + 1))
-                set_scores = []
-                for set_line in sets_file:
-                    set_line = set_line.strip()
-                    assessment = assess_set_line(list(set(set_line.split(','))))
-                    if assessment is None or assessment == 0:
-                        set_scores.append(0)
-                    else:
-                        set_scores.append(assessment)
-                with open(scores_file_path, 'w') as scores_file:
-                    scores_file.write(str(set_scores) + "," + str(current_sets_file_index))
-                    scores_file.close()
-            sets_file.close()
-            mean_score = mean(set_scores)
-            try:
-                dna_scores.append(int(mean_score))
-            except TypeError:
-                dna_scores.append(0)
-            with open(mean_file_path, 'w') as mean_file:
-                mean_file.write(str(int(mean_score)))
-                mean_file.close()
-
-        print("Assessing DNAs took " + str(time()-start) + " seconds.")
-        start = time()
-        # Generating the top score indices for this generation.
-        generation_top_scores = get_top_scores(current_gen_folder)
-        print("Top score: " + str(max(dna_scores)) + " Average score: " + str(mean(dna_scores)))
-        with open(current_gen_folder + '/top_scores', 'w') as top_scores_file:
-            score_index = 0
-            for score in generation_top_scores:
-                top_scores_file.write(str(score_index) + ":" + str(score) + '\n')
-                score_index += 1
-        top_scores_file.close()
-        print("Getting top scores took " + str(time()-start) + " seconds.")
-        print("Ascending top DNAs to the next generation.")
-        ascend_dna(generation_top_scores, generation)
-        print("Completing the next generation with new random DNAs.")
-        start = time()
-        pool = Pool(processes=core_count())
-        member = 0
-        for member in range(len(generation_top_scores), S.POPULATION_SIZE):
-            pool.apply_async(generate_member, args=(member, next_gen_folder))
-        pool.close()
-        pool.join()
-        print("Completing next generation took" + str(time()-start) + " seconds.")
-        print("Generation " + str(generation) + " took " + str(time()-gen_time) + " seconds.")
+    if "--help" in argv[1:]:
+        print(HELP)
+        return
+    resume = "--resume" in argv[1:]
+    islands = None
+    island = None
+    address = ('localhost', S.ISLAND_PORT)
+    for arg in argv[1:]:
+        if "--islands=" in arg:
+            islands = int(arg.split("=")[1])
+        elif "--island=" in arg:
+            island = int(arg.split("=")[1])
+        elif "--seed=" in arg:
+            S.SEED = int(arg.split("=")[1])
+        elif "--metrics=" in arg:
+            S.METRICS_FILE = arg.split("=")[1]
+        elif "--profile=" in arg:
+            S.PROFILE_GENERATION = int(arg.split("=")[1])
+        elif "--coordinator=" in arg:
+            address = parse_address(arg.split("=")[1])
+        elif "--authkey=" in arg:
+            S.ISLAND_AUTHKEY = arg.split("=", 1)[1].encode()
+        elif arg == "--quiet":
+            S.QUIET = True
+        elif arg not in ("--resume", "--serve"):
+            print(HELP)
+            return
+
+    # Islands started on their own, or a coordinator others can reach, can't use this process's random key.
+    if (island is not None or (islands is not None and ("--serve" in argv[1:] or not is_loopback(address[0])))) \
+            and shared_authkey() is None:
+        print("Islands and coordinators started on their own need a shared key: --authkey=<key> or "
+              "BETTER_ISLAND_AUTHKEY")
+        return
+    if island is not None:
+        run_island(island, address, resume)
+    elif islands is not None and "--serve" in argv[1:]:
+        run_coordinator(address, islands)
+    elif islands is not None:
+        # Every island gets its share of the cores.
+        coordinator = Process(target=run_coordinator, args=(address, islands))
+        coordinator.start()
+        island_processes = [Process(target=run_island, args=(island, address, resume,
+                                                             max(1, core_count() // islands)))
+                            for island in range(islands)]
+        for island_process in island_processes:
+            island_process.start()
+        for island_process in island_processes:
+            island_process.join()
+        coordinator.join()
+    else:
+        evolve(resume)
 
 
 if __name__ == '__main__':
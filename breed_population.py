@@ -0,0 +1,144 @@
+from array import array
+
+from numpy import (arange, asarray, concatenate, cumsum, diff, flatnonzero, frombuffer, int64, repeat, stack, uint8,
+                   zeros)
+
+from genome import Genome, as_dna
+from random_streams import get_stream
+import settings as S
+
+
+def pack_population(population):
+    """
+    param: Packs a population into flat arrays: all letters, all operator codes and a key flag per letter one
+    member after another, with offsets[member] the position of a member's first letter.
+    type: list[Genome or list[str,...,[int]]]
+    return: numpy.ndarray (uint8), numpy.ndarray (uint8), numpy.ndarray (bool), numpy.ndarray (int, members + 1)
+    """
+    genomes = [dna if isinstance(dna, Genome) else Genome.from_dna(as_dna(dna)) for dna in population]
+    offsets = zeros(len(genomes) + 1, dtype=int64)
+    offsets[1:] = cumsum([len(genome.letters) for genome in genomes])
+    letters = frombuffer(b''.join(genome.letters.tobytes() for genome in genomes), dtype=uint8).copy()
+    packed = [frombuffer(genome.operators, dtype=uint8) for genome in genomes]
+    codes = concatenate([((stack([packed_codes >> shift for shift in (0, 2, 4, 6)], axis=1) & 3).ravel()
+                          [:len(genome.letters) - 1]) for genome, packed_codes in zip(genomes, packed)])
+    keys = zeros(len(letters), dtype=bool)
+    for member, genome in enumerate(genomes):
+        keys[offsets[member] + frombuffer(genome.key.tobytes(), dtype='<u2').astype(int64)] = True
+    return letters, codes.astype(uint8), keys, offsets
+
+
+def unpack_population(letters, codes, keys, offsets):
+    """
+    param: Turns packed arrays back into a list of Genomes.
+    type: numpy.ndarray (uint8), numpy.ndarray (uint8), numpy.ndarray (bool), numpy.ndarray (int)
+    return: list[Genome]
+    """
+    genomes = []
+    for member in range(len(offsets) - 1):
+        start, end = offsets[member], offsets[member + 1]
+        member_codes = zeros((end - start + 2) // 4 * 4, dtype=uint8)
+        member_codes[:end - start - 1] = codes[start - member:end - member - 1]
+        member_codes = member_codes.reshape(-1, 4)
+        operators = member_codes[:, 0] | member_codes[:, 1] << 2 | member_codes[:, 2] << 4 | member_codes[:, 3] << 6
+        genomes.append(Genome(array('B', letters[start:end].tobytes()), operators.astype(uint8).tobytes(),
+                              array('H', flatnonzero(keys[start:end]).tolist())))
+    return genomes
+
+
+def gather_ranges(starts, ends):
+    """
+    param: The indices of several [start, end) ranges, one after the other, in one array.
+    type: numpy.ndarray (int), numpy.ndarray (int)
+    return: numpy.ndarray (int)
+    """
+    lengths = ends - starts
+    firsts = cumsum(lengths) - lengths
+    return arange(lengths.sum()) - repeat(firsts, lengths) + repeat(starts, lengths)
+
+
+def splice(letters, codes, keys, offsets, keep_until, resume_at):
+    """
+    param: Rebuilds every member as its letters [0, keep_until) followed by [resume_at, length), with the
+    operator after each letter, all in one gather. Duplication and reduction of pairs are both splices.
+    type: packed arrays, numpy.ndarray (int, members), numpy.ndarray (int, members)
+    return: numpy.ndarray (uint8), numpy.ndarray (uint8), numpy.ndarray (bool), numpy.ndarray (int)
+    """
+    lengths = diff(offsets)
+    starts = offsets[:-1]
+    letter_index = gather_ranges(stack([starts, starts + resume_at], axis=1).ravel(),
+                                 stack([starts + keep_until, starts + lengths], axis=1).ravel())
+    code_starts = starts - arange(len(lengths))
+    code_index = gather_ranges(stack([code_starts, code_starts + resume_at.clip(0, lengths - 1)], axis=1).ravel(),
+                               stack([code_starts + keep_until.clip(0, lengths - 1), code_starts + lengths - 1],
+                                     axis=1).ravel())
+    new_offsets = zeros(len(offsets), dtype=int64)
+    new_offsets[1:] = cumsum(keep_until + lengths - resume_at)
+    return letters[letter_index], codes[code_index], keys[letter_index], new_offsets
+
+
+def breed_population(population, parents, rng=None):
+    """
+    param: Breeds the next generation from the parents (indices into population, one per child) as whole-population
+    array operations: all operator rolls are drawn at once, then mutation, pair duplication, pair reduction and
+    crossover each run over the packed arrays. Pairs (a letter and the operator after it) are always duplicated
+    or removed whole, so letters and operators keep alternating, and the key flags move with their letters.
+    Crossover donors are other parents, read from the packed parent arrays.
+    type: list[Genome or list[str,...,[int]]], list[int], numpy.random.Generator
+    return: list[Genome], list[int] (donor of every child, -1 for none)
+    """
+    if rng is None:
+        rng = get_stream().generator
+    parents = list(parents)
+    children = len(parents)
+    parent_letters, parent_codes, parent_keys, parent_offsets = pack_population([population[index]
+                                                                                 for index in parents])
+    letters, codes, keys, offsets = parent_letters.copy(), parent_codes.copy(), parent_keys.copy(), parent_offsets
+    # Every roll of the generation at once: which operators hit which child, where, and how many pairs.
+    rates = asarray([S.DNA_MUTATION_RATE, S.DNA_DUPLICATION_RATE, S.DNA_REDUCTION_RATE, S.DNA_MIX_RATE])
+    mutate, duplicate, reduce, mix = rng.random((4, children)) * 100 < rates[:, None]
+    positions = rng.random((5, children))
+    pairs = rng.integers(S.CHANGE_MIN_LENGTH, S.CHANGE_MAX_LENGTH, size=(2, children))  # Like randrange.
+    cross_pairs = rng.integers(S.CHANGE_MIN_LENGTH, S.CHANGE_MAX_LENGTH, size=children, endpoint=True)
+    letter_range = S.MAXIMUM_LETTER_VALUE - S.MINIMUM_LETTER_VALUE + 1
+
+    # Mutation: one letter of each mutating child becomes a different letter.
+    lengths = diff(offsets)
+    targets = offsets[:-1] + (positions[0] * lengths).astype(int64)
+    shifts = rng.integers(1, letter_range, size=children)
+    mutated = (letters[targets].astype(int64) - S.MINIMUM_LETTER_VALUE + shifts) % letter_range
+    letters[targets[mutate]] = (mutated + S.MINIMUM_LETTER_VALUE)[mutate]
+
+    # Duplication: a run of pairs is copied in front of itself.
+    lengths = diff(offsets)
+    counts = (pairs[0] * duplicate).clip(0, lengths - 1)
+    starts = (positions[1] * (lengths - counts)).astype(int64)
+    letters, codes, keys, offsets = splice(letters, codes, keys, offsets, starts + counts, starts)
+
+    # Reduction: a run of pairs is cut out, always leaving at least two letters.
+    lengths = diff(offsets)
+    counts = (pairs[1] * reduce).clip(0, lengths - 2).clip(0)
+    starts = (positions[2] * (lengths - counts)).astype(int64)
+    letters, codes, keys, offsets = splice(letters, codes, keys, offsets, starts, starts + counts)
+
+    # Crossover: a run of letters and the operators between them is copied over from a donor parent.
+    donors = rng.integers(0, max(children - 1, 1), size=children)
+    donors = donors + (donors >= arange(children))  # Never the child's own parent slot.
+    mix = mix & (children > 1)
+    donors = donors.clip(0, children - 1)
+    lengths = diff(offsets)
+    donor_lengths = diff(parent_offsets)[donors]
+    counts = (cross_pairs * mix).clip(0, lengths).clip(0, donor_lengths)
+    receiver_starts = offsets[:-1] + (positions[3] * (lengths - counts + 1)).astype(int64).clip(0, lengths - counts)
+    donor_starts = (parent_offsets[:-1][donors] +
+                    (positions[4] * (donor_lengths - counts + 1)).astype(int64).clip(0, donor_lengths - counts))
+    letters[gather_ranges(receiver_starts, receiver_starts + counts)] = \
+        parent_letters[gather_ranges(donor_starts, donor_starts + counts)]
+    operator_counts = (counts - 1).clip(0)
+    receiver_codes = receiver_starts - arange(children)
+    donor_codes = donor_starts - donors
+    codes[gather_ranges(receiver_codes, receiver_codes + operator_counts)] = \
+        parent_codes[gather_ranges(donor_codes, donor_codes + operator_counts)]
+
+    donor_members = [parents[donor] if mixed else -1 for donor, mixed in zip(donors.tolist(), mix.tolist())]
+    return unpack_population(letters, codes, keys, offsets), donor_members
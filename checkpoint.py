@@ -0,0 +1,104 @@
+from glob import glob
+from hashlib import sha256
+from io import BytesIO
+from json import dumps, loads
+from os import makedirs, path, remove, replace
+from zipfile import BadZipFile
+
+from numpy import array, cumsum, frombuffer, int64, load, savez, uint8, zeros
+
+from genome import Genome
+from metrics import count
+import settings as S
+
+CHECKPOINT_VERSION = 4
+# Settings that only say how a run is carried out, changing them doesn't stop a checkpoint from being resumed.
+RUN_SETTINGS = ('GENERATIONS', 'CHECKPOINT_FOLDER', 'CHECKPOINT_KEEP', 'FITNESS_CACHE_FILE', 'FREE_THREADS',
+                'HISTORY_FILE', 'HISTORY_SETS', 'HISTORY_SETS_EVERY', 'ISLAND_PORT', 'ISLAND_AUTHKEY',
+                'ISLAND_CONNECT_TIMEOUT', 'SEED', 'QUIET', 'METRICS_FILE', 'METRICS_FORMAT',
+                'PROFILE_GENERATION', 'PROFILE_INTERVAL', 'PROFILE_FILE')
+
+
+def settings_hash():
+    """
+    param: Hashes the settings that shape the evolution, so a checkpoint is only resumed with the settings it was
+    written with.
+    type: None
+    return: str
+    """
+    values = [(name, repr(getattr(S, name))) for name in sorted(dir(S))
+              if name.isupper() and name not in RUN_SETTINGS]
+    return sha256(repr(values).encode()).hexdigest()
+
+
+def checkpoint_path(generation):
+    """
+    param: The file a generation's checkpoint is kept in.
+    type: int
+    return: str
+    """
+    return path.join(S.CHECKPOINT_FOLDER, 'generation-' + str(generation).zfill(6) + '.ckpt')
+
+
+def save_checkpoint(generation, population, dna_scores, streams, fitness_cache):
+    """
+    param: Writes an assessed generation to one file: the packed genomes, their scores, the random streams'
+    state, the fitness cache entries and the settings hash. The streams and the cache are all a resumed run needs
+    to go on exactly like the run that wrote the checkpoint. The file is written aside and renamed in place, so a
+    checkpoint is either complete or not there. Only the newest CHECKPOINT_KEEP checkpoints are kept.
+    type: int, list[Genome], list[int], RandomStreams, FitnessCache
+    return: str
+    """
+    makedirs(S.CHECKPOINT_FOLDER, exist_ok=True)
+    genomes = [genome.to_bytes() for genome in population]
+    offsets = zeros(len(genomes) + 1, dtype=int64)
+    offsets[1:] = cumsum([len(genome) for genome in genomes])
+    # The streams' state is plain ints, kept as JSON so that reading a checkpoint never unpickles anything.
+    state = dumps(streams.state())
+    cache_keys, cache_stats = fitness_cache.arrays()
+    checkpoint_file = checkpoint_path(generation)
+    buffer = BytesIO()
+    savez(buffer, version=array(CHECKPOINT_VERSION), generation=array(generation),
+          settings=array(settings_hash()), genomes=frombuffer(b''.join(genomes), dtype=uint8), offsets=offsets,
+          scores=array(dna_scores, dtype=int64), state=array(state), cache_keys=cache_keys,
+          cache_stats=cache_stats)
+    with open(checkpoint_file + '.tmp', 'wb') as temp_file:
+        count('bytes_written', temp_file.write(buffer.getvalue()))
+    replace(checkpoint_file + '.tmp', checkpoint_file)
+    for old_file in sorted(glob(path.join(S.CHECKPOINT_FOLDER, 'generation-*.ckpt')))[:-S.CHECKPOINT_KEEP]:
+        remove(old_file)
+    return checkpoint_file
+
+
+def load_checkpoint(checkpoint_file, streams, fitness_cache):
+    """
+    param: Reads a checkpoint and restores the random streams' state into streams and its entries into the fitness
+    cache. Raises ValueError if it was written by another version or with other settings.
+    type: str, RandomStreams, FitnessCache
+    return: int (generation), list[Genome], list[int] (scores)
+    """
+    with load(checkpoint_file, allow_pickle=False) as data:
+        if int(data['version']) != CHECKPOINT_VERSION:
+            raise ValueError("Unknown checkpoint version: " + str(data['version']))
+        if str(data['settings']) != settings_hash():
+            raise ValueError("Checkpoint was written with different settings")
+        genomes = data['genomes'].tobytes()
+        offsets = data['offsets'].tolist()
+        population = [Genome.from_bytes(genomes, offset) for offset in offsets[:-1]]
+        streams.restore(loads(str(data['state'])))
+        fitness_cache.restore(data['cache_keys'], data['cache_stats'])
+        return int(data['generation']), population, data['scores'].tolist()
+
+
+def find_checkpoint(streams, fitness_cache):
+    """
+    param: Loads the newest checkpoint that can be resumed, skipping broken or incompatible ones.
+    type: RandomStreams, FitnessCache
+    return: (int, list[Genome], list[int]) or None
+    """
+    for checkpoint_file in sorted(glob(path.join(S.CHECKPOINT_FOLDER, 'generation-*.ckpt')), reverse=True):
+        try:
+            return load_checkpoint(checkpoint_file, streams, fitness_cache)
+        except (ValueError, OSError, KeyError, EOFError, BadZipFile) as error:
+            print("Skipping checkpoint " + checkpoint_file + ": " + str(error))
+    return None
@@ -0,0 +1,44 @@
+#!/usr/bin/python
+
+from os import path
+from sys import argv
+
+from genome import Genome, as_dna, load_dna
+
+"""
+This script converts DNA files between the text format of the generation folders and binary genomes.
+type: str (paths to files)
+returns: None (writes <file>.genome next to each text file, or <file>.txt next to each binary one with --text)
+"""
+
+HELP = "Usage: python convert_dna.py <DNA file> [<DNA file> ...]\nOPTIONAL: --text (convert binary genomes to text)"
+
+
+def main():
+    if len(argv) < 2 or "--help" in argv:
+        print(HELP)
+        return
+
+    to_text = "--text" in argv
+    for dna_path in argv[1:]:
+        if dna_path == "--text":
+            continue
+        if not path.exists(dna_path):
+            print("File does not exist: ", dna_path)
+            continue
+        dna = load_dna(dna_path)
+        if to_text:
+            with open(dna_path + '.txt', 'w') as dna_file:
+                dna_file.write(str(as_dna(dna)))
+            continue
+        try:
+            genome = dna if isinstance(dna, Genome) else Genome.from_dna(dna)
+        except ValueError as error:
+            print("Can't convert " + dna_path + ": " + str(error))
+            continue
+        with open(dna_path + '.genome', 'wb') as genome_file:
+            genome_file.write(genome.to_bytes())
+
+
+if __name__ == "__main__":
+    main()
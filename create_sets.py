@@ -1,24 +1,25 @@
-from ast import literal_eval
+from numpy import array
 
-from calculate_digit import calculate_digit as cd
+from batch_digits import batch_digits
+from compile_dna import compile_dna
+from dna_distribution import compile_distribution, sample_distribution
+from random_streams import get_stream
 import settings as S
 
 
-def create_sets(GENERATION, member):
+def create_sets(dna, size=None, length=None):
     """
-    param: Creates the sets for a given DNA.
-    type: int, int
-    return: None
+    param: Creates the sets for a given DNA, SET_SIZE lines of SET_LENGTH digits unless told otherwise.
+    type: list[str,...,[int]] or Genome, int, int
+    return: numpy.ndarray (int, size x length)
     """
-    print("Creating sets for member: " + str(member + 1))
-    with open(S.GEN_FOLDER + str(GENERATION) + '/dna_' + str(member), "r") as dna_file:
-        dna = literal_eval(dna_file.read())
-        dna_file.close()
-    with open(S.GEN_FOLDER + str(GENERATION) + '/dna_' + str(member) + '_sets', 'w') as sets_file:
-        for i in range(S.SET_SIZE):
-            line = ""
-            for number in range(S.SET_LENGTH):
-                line += str(cd(dna)) + ','
-            line = line[:-1] + '\n'
-            sets_file.write(line)
-    sets_file.close()
+    size = S.SET_SIZE if size is None else size
+    length = S.SET_LENGTH if length is None else length
+    if S.DISTRIBUTION_SAMPLING:
+        distribution = compile_distribution(dna)
+        if distribution is not None:
+            return sample_distribution(distribution, (size, length), get_stream().generator)
+    if S.BATCH_EVALUATION:
+        return batch_digits(dna, (size, length))
+    cd = compile_dna(dna)
+    return array([[cd() for number in range(length)] for i in range(size)])
@@ -0,0 +1,140 @@
+from itertools import product
+
+from numpy import array, bincount, float64, int64, ones, rint, unique, zeros
+
+from batch_digits import evaluate_plan, plan_dna
+from genome import as_dna
+import settings as S
+
+
+def term_distribution(term, columns):
+    """
+    param: Enumerates every letter combination of the key slots inside one term.
+    type: [str, [[str, bool, int]]], int (number of key columns)
+    return: numpy.ndarray (float, values), numpy.ndarray (float, probabilities)
+    """
+    slots = sorted(set(value for operator, is_slot, value in term[1] if is_slot))
+    letter_values = range(S.MINIMUM_LETTER_VALUE, S.MAXIMUM_LETTER_VALUE + 1)
+    combinations = list(product(letter_values, repeat=len(slots)))
+    letters = ones((len(combinations), columns), dtype=int64)
+    if slots:
+        letters[:, slots] = array(combinations, dtype=int64)
+    # The sign is applied when the terms are added up, exactly where eval applies it.
+    values = evaluate_plan([['+', term[1]]], letters)
+    if not slots:
+        return values, ones(1)
+    values, inverse = unique(values, return_inverse=True)
+    return values, bincount(inverse.ravel(), minlength=len(values)) / len(combinations)
+
+
+def build_distribution(dna):
+    """
+    param: Builds the exact distribution of the digits a DNA generates. Terms are enumerated over their own key
+    slots and added up left to right like eval does, so every outcome is computed with the same float operations.
+    Returns None if the DNA can't be planned or the outcomes outgrow DISTRIBUTION_MAX_STATES.
+    type: list[str,...,[int]] or Genome
+    return: numpy.ndarray (int, digits), numpy.ndarray (float, probabilities) or None
+    """
+    dna = as_dna(dna)
+    plan = plan_dna(dna)
+    if plan is None:
+        return None
+    columns = len(dna[-1])
+    values = None
+    for term in plan:
+        slots = set(value for operator, is_slot, value in term[1] if is_slot)
+        if (S.MAXIMUM_LETTER_VALUE - S.MINIMUM_LETTER_VALUE + 1) ** len(slots) > S.DISTRIBUTION_MAX_STATES:
+            return None
+        term_values, term_probabilities = term_distribution(term, columns)
+        if values is None:
+            values = term_values if term[0] == '+' else -term_values
+            probabilities = term_probabilities
+            continue
+        if len(term_values) == 1:
+            # A constant term shifts every outcome, there is nothing to combine.
+            values = values + term_values[0] if term[0] == '+' else values - term_values[0]
+            continue
+        if len(values) * len(term_values) > S.DISTRIBUTION_MAX_STATES:
+            return None
+        if term[0] == '+':
+            sums = values[:, None] + term_values[None, :]
+        else:
+            sums = values[:, None] - term_values[None, :]
+        weights = probabilities[:, None] * term_probabilities[None, :]
+        values, inverse = unique(sums.ravel(), return_inverse=True)
+        probabilities = bincount(inverse.ravel(), weights=weights.ravel(), minlength=len(values))
+    digits, inverse = unique(rint(values).astype(int64), return_inverse=True)
+    return digits, bincount(inverse.ravel(), weights=probabilities, minlength=len(digits))
+
+
+def alias_table(probabilities):
+    """
+    param: Builds Vose's alias table, so that drawing from the distribution costs one index and one coin per sample.
+    type: numpy.ndarray (float, probabilities)
+    return: numpy.ndarray (float, thresholds), numpy.ndarray (int, aliases)
+    """
+    count = len(probabilities)
+    scaled = array(probabilities, dtype=float64) * count / probabilities.sum()
+    thresholds = ones(count, dtype=float64)
+    aliases = array(range(count), dtype=int64)
+    small = [index for index in range(count) if scaled[index] < 1]
+    large = [index for index in range(count) if scaled[index] >= 1]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        thresholds[less] = scaled[less]
+        aliases[less] = more
+        scaled[more] = scaled[more] + scaled[less] - 1
+        if scaled[more] < 1:
+            small.append(more)
+        else:
+            large.append(more)
+    return thresholds, aliases
+
+
+def compile_distribution(dna):
+    """
+    param: Builds a DNA's digit distribution and its alias table. Returns None when it can't be built, the caller
+    then falls back to evaluating the DNA.
+    type: list[str,...,[int]] or Genome
+    return: (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray) or None
+    """
+    distribution = build_distribution(dna)
+    if distribution is None:
+        return None
+    digits, probabilities = distribution
+    thresholds, aliases = alias_table(probabilities)
+    return digits, probabilities, thresholds, aliases
+
+
+def sample_distribution(distribution, size, rng):
+    """
+    param: Draws digits from a compiled distribution with its alias table.
+    type: (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray), int or tuple, numpy.random.Generator
+    return: numpy.ndarray (int, size)
+    """
+    digits, probabilities, thresholds, aliases = distribution
+    columns = rng.integers(0, len(digits), size=size)
+    keep = rng.random(size=size) < thresholds[columns]
+    return digits[columns * keep + aliases[columns] * ~keep]
+
+
+def expected_health(distribution):
+    """
+    param: The health is_valid would count for a DNA, worked out from its distribution instead of sampled:
+    the expected hits in SET_SIZE tests, minus the expected number of repeated digits when there are enough hits.
+    type: (numpy.ndarray (int, digits), numpy.ndarray (float, probabilities), ...)
+    return: float
+    """
+    digits, probabilities = distribution[0], distribution[1]
+    in_range = (digits >= S.MINIMUM_DIGIT) & (digits <= S.MAXIMUM_DIGIT)
+    digit_probabilities = zeros(S.MAXIMUM_DIGIT + 1)
+    digit_probabilities[digits[in_range]] = probabilities[in_range]
+    health = S.SET_SIZE * digit_probabilities.sum()
+    if health > S.SET_HEALTH:
+        # Same as is_valid: every digit below MAXIMUM_DIGIT that came up more than once costs one point.
+        chances = digit_probabilities[:-1]
+        repeated = (1 - (1 - chances) ** S.SET_SIZE -
+                    S.SET_SIZE * chances * (1 - chances) ** (S.SET_SIZE - 1))
+        health -= repeated.sum()
+    return float(health)
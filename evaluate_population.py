@@ -0,0 +1,116 @@
+from math import sqrt
+
+from numpy import concatenate
+
+from assess_member import assess_member, assess_stored, mean_score
+from fitness_cache import merge_stats, score_stats, stats_mean, stats_variance
+from metrics import count
+from schedule_tasks import task_features
+import settings as S
+
+
+def assess_round(scheduler, population, wanted, stats, results, fitness_cache, keep_sets, seed, store=None):
+    """
+    param: Assesses more sets for some members on the scheduler and adds them to their statistics and results.
+    Every task gets seed(member, sets the member already has) as its seed. With the population published to a
+    SharedPopulation, the workers read the genomes from it and write the set scores into it.
+    type: Scheduler, list[Genome], list[(int, int)] (member, sets), list, list, FitnessCache, bool,
+    function(int, int) -> numpy.random.SeedSequence, SharedPopulation
+    return: int (sets assessed)
+    """
+    wanted = [(member, size) for member, size in wanted if size > 0]
+    features = [task_features(population[member], size) for member, size in wanted]
+    if store is None:
+        tasks = [(population[member], member, keep_sets, size, seed(member, stats[member][0]))
+                 for member, size in wanted]
+        round_results = scheduler.map('assess', assess_member, tasks, features)
+    else:
+        # Scores go into the member's row after the ones it already got in this evaluation.
+        columns = [0 if results[member] is None else len(results[member][1]) for member, size in wanted]
+        tasks = [(store.name, member, column, size, keep_sets, seed(member, stats[member][0]))
+                 for (member, size), column in zip(wanted, columns)]
+        round_sets = scheduler.map('assess', assess_stored, tasks, features)
+        scores = store.scores
+        round_results = []
+        for (member, size), column, sets in zip(wanted, columns, round_sets):
+            set_scores = scores[member, column:column + size].copy()
+            round_results.append((mean_score(set_scores), set_scores, sets))
+        del scores
+    for (member, size), result in zip(wanted, round_results):
+        stats[member] = merge_stats(stats[member], score_stats(result[1]))
+        fitness_cache.put(population[member], stats[member])
+        if results[member] is None:
+            results[member] = result
+        else:
+            sets = None if result[2] is None else concatenate((results[member][2], result[2]))
+            results[member] = (stats_mean(stats[member]), concatenate((results[member][1], result[1])), sets)
+    assessed = sum(size for member, size in wanted)
+    count('members_assessed', len(wanted))
+    count('sets_assessed', assessed)
+    return assessed
+
+
+def race(scheduler, population, stats, results, fitness_cache, keep_sets, seed, store=None):
+    """
+    param: Races the members for the ASCENDING cut: every round the members still in the race get twice as many
+    sets, and a member leaves it once its confidence bound puts it clearly above or clearly below the cut.
+    Members that come from the fitness cache pick their race up from the sets they already have, and get at least
+    FITNESS_CACHE_TOP_UP new sets in the first round.
+    type: Scheduler, list[Genome], list, list, FitnessCache, bool, function(int, int) -> numpy.random.SeedSequence,
+    SharedPopulation
+    return: int (sets assessed)
+    """
+    survivors = max(1, S.ASCENDING * len(population) // 100)
+    racing = list(range(len(population)))
+    target = S.RACE_INITIAL_SETS
+    top_up = [S.FITNESS_CACHE_TOP_UP if member_stats[0] else 0 for member_stats in stats]
+    assessed = 0
+    while racing:
+        wanted = [(member, max(min(target, S.SET_SIZE) - stats[member][0], top_up[member])) for member in racing]
+        top_up = [0] * len(population)
+        assessed += assess_round(scheduler, population, wanted, stats, results, fitness_cache, keep_sets, seed,
+                                 store)
+        if survivors >= len(population):
+            break
+        errors = [S.RACE_CONFIDENCE * sqrt(stats_variance(member_stats) / max(member_stats[0], 1))
+                  for member_stats in stats]
+        means = [member_stats[1] / max(member_stats[0], 1) for member_stats in stats]
+        lower = sorted((mean - error for mean, error in zip(means, errors)), reverse=True)
+        upper = sorted((mean + error for mean, error in zip(means, errors)), reverse=True)
+        # At least `survivors` members are surely above lower[survivors - 1] and at most `survivors` of them can
+        # be above upper[survivors], anything outside that band is settled.
+        racing = [member for member in racing if stats[member][0] < S.SET_SIZE and
+                  means[member] + errors[member] >= lower[survivors - 1] and
+                  means[member] - errors[member] <= upper[survivors]]
+        target *= 2
+    return assessed
+
+
+def evaluate_population(scheduler, population, fitness_cache, keep_sets=False, streams=None, generation=0,
+                        store=None):
+    """
+    param: Scores a population. Members found in the fitness cache reuse their statistics (topped up with
+    FITNESS_CACHE_TOP_UP sets), the rest get SET_SIZE sets, or race for the cut when RACING is on. Statistics a
+    race left with fewer than SET_SIZE sets are only partial, without racing they are assessed up to SET_SIZE.
+    The tasks draw from the run's streams, fresh entropy without them. The store, when given, holds the population
+    in shared memory (see SharedPopulation.publish).
+    type: Scheduler, list[Genome], FitnessCache, bool, RandomStreams, int, SharedPopulation
+    return: list[int] (scores), list[(int, int, int)] (score statistics), list (results per member, or None),
+    int (sets assessed), int (cache hits)
+    """
+    stats = [fitness_cache.get(dna) for dna in population]
+    cache_hits = len([member_stats for member_stats in stats if member_stats is not None])
+    count('fitness_cache_hits', cache_hits)
+    stats = [(0, 0, 0) if member_stats is None else member_stats for member_stats in stats]
+    results = [None] * len(population)
+
+    def seed(member, done):
+        return None if streams is None else streams.task_seed('assess', generation, member, done)
+    if S.RACING:
+        assessed = race(scheduler, population, stats, results, fitness_cache, keep_sets, seed, store)
+    else:
+        wanted = [(member, S.SET_SIZE - member_stats[0] if member_stats[0] < S.SET_SIZE else S.FITNESS_CACHE_TOP_UP)
+                  for member, member_stats in enumerate(stats)]
+        assessed = assess_round(scheduler, population, wanted, stats, results, fitness_cache, keep_sets, seed,
+                                store)
+    return [stats_mean(member_stats) for member_stats in stats], stats, results, assessed, cache_hits
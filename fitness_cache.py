@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from hashlib import sha1, sha256
+from os import path, replace
+
+from numpy import array, int64, load, savez, zeros
+
+from batch_digits import plan_dna
+from checkpoint import settings_hash
+from fold_dna import canonical_form, fold_plan
+from genome import Genome, pack_dna
+from metrics import count
+import settings as S
+from test_index import get_test_index
+
+
+def genome_hash(dna):
+    """
+    param: Returns the hash a genome is cached under: its canonical folded form when it can be planned, so
+    genomes that only differ in how they write the same sum share their statistics, else its binary encoding,
+    or the text form for DNAs that can't be packed.
+    type: Genome or list[str,...,[int]]
+    return: str
+    """
+    dna = pack_dna(dna)
+    plan = plan_dna(dna)
+    if plan is not None:
+        return sha1(repr(canonical_form(fold_plan(plan))).encode()).hexdigest()
+    if isinstance(dna, Genome):
+        return sha1(dna.to_bytes()).hexdigest()
+    return sha1(str(dna).encode()).hexdigest()
+
+
+def scored_against():
+    """
+    param: Hashes what the scores were computed against: the settings and the index of the test file.
+    Statistics cached under another hash are stale.
+    type: None
+    return: str
+    """
+    return sha256((settings_hash() + ':').encode() + get_test_index().tobytes()).hexdigest()
+
+
+def score_stats(set_scores):
+    """
+    param: Sums up the scores of a member's sets as (count, total, total of squares).
+    type: numpy.ndarray or list[int]
+    return: (int, int, int)
+    """
+    set_scores = [int(score) for score in set_scores]
+    return len(set_scores), sum(set_scores), sum(score * score for score in set_scores)
+
+
+def merge_stats(first, second):
+    """
+    param: Adds up two (count, total, total of squares) statistics.
+    type: (int, int, int), (int, int, int)
+    return: (int, int, int)
+    """
+    return first[0] + second[0], first[1] + second[1], first[2] + second[2]
+
+
+def stats_mean(stats):
+    """
+    param: The mean set score of some statistics, as the int a member is ranked by.
+    type: (int, int, int)
+    return: int
+    """
+    if stats[0] == 0:
+        return 0
+    return int(stats[1] / stats[0])
+
+
+def stats_variance(stats):
+    """
+    param: The variance of the set scores behind some statistics.
+    type: (int, int, int)
+    return: float
+    """
+    if stats[0] == 0:
+        return 0.0
+    return max(stats[2] / stats[0] - (stats[1] / stats[0]) ** 2, 0.0)
+
+
+class FitnessCache:
+    """
+    Score statistics of the genomes seen so far, by genome hash, so that survivors that didn't change don't get
+    their sets created and scored all over again. Holds at most `size` genomes, dropping the least recently used.
+    """
+
+    def __init__(self, size=None, cache_path=None):
+        """
+        param: Creates the cache and loads it from cache_path when that file exists and was written against the
+        same settings and test file; a stale file is left to be replaced by the next save().
+        type: int, str
+        return: None
+        """
+        self.size = S.FITNESS_CACHE_SIZE if size is None else size
+        self.cache_path = S.FITNESS_CACHE_FILE if cache_path is None else cache_path
+        self.entries = OrderedDict()
+        if self.cache_path and path.exists(self.cache_path):
+            # Plain arrays only (no pickles), so a cache file can't run code when it is read.
+            with load(self.cache_path, allow_pickle=False) as data:
+                if str(data['scored_against']) == scored_against():
+                    self.restore(data['keys'], data['stats'])
+                else:
+                    print("Ignoring fitness cache " + self.cache_path + ": written with other settings or tests")
+
+    def arrays(self):
+        """
+        param: The entries as arrays, least recently used first.
+        type: None
+        return: numpy.ndarray (str) genome hashes, numpy.ndarray (int, entries x 3) statistics
+        """
+        if not self.entries:
+            return array([], dtype='<U40'), zeros((0, 3), dtype=int64)
+        return array(list(self.entries)), array(list(self.entries.values()), dtype=int64)
+
+    def restore(self, keys, stats):
+        """
+        param: Replaces the entries with the ones arrays() returned.
+        type: numpy.ndarray (str), numpy.ndarray (int, entries x 3)
+        return: None
+        """
+        self.entries = OrderedDict(zip(keys.tolist(), [tuple(row) for row in stats.tolist()]))
+        self.evict()
+
+    def get(self, dna):
+        """
+        param: Returns the statistics cached for a genome, or None.
+        type: Genome or list[str,...,[int]]
+        return: (int, int, int) or None
+        """
+        key = genome_hash(dna)
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, dna, stats):
+        """
+        param: Stores the statistics of a genome, replacing whatever was cached for it.
+        type: Genome or list[str,...,[int]], (int, int, int)
+        return: None
+        """
+        key = genome_hash(dna)
+        self.entries[key] = stats
+        self.entries.move_to_end(key)
+        self.evict()
+
+    def evict(self):
+        """
+        param: Drops the least recently used genomes above the size bound.
+        type: None
+        return: None
+        """
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        """
+        param: Writes the cache to its file, if it has one, with the hash of what the scores were computed
+        against. The file is replaced in one step.
+        type: None
+        return: None
+        """
+        if not self.cache_path:
+            return
+        keys, stats = self.arrays()
+        with open(self.cache_path + '.tmp', 'wb') as cache_file:
+            savez(cache_file, scored_against=array(scored_against()), keys=keys, stats=stats)
+            count('bytes_written', cache_file.tell())
+        replace(self.cache_path + '.tmp', self.cache_path)
@@ -0,0 +1,130 @@
+from numpy import asarray, float64, zeros
+
+"""
+Constant folding of planned DNAs (see batch_digits.plan_dna). A folded DNA is one constant plus the terms that read
+key slots, each with its constant factors already multiplied into a coefficient, so evaluating it only touches the
+variable part. Folding never changes a digit: when every term is a whole number on every draw the float maths is
+exact and terms can be combined and reordered freely, otherwise only the work eval would do first anyway (the
+constant terms in front, the constant factors in front of a term) is done ahead of time and the rest keeps its order.
+"""
+
+
+def term_value(factors):
+    """
+    param: Evaluates the factors of a term that has no key slots, the way eval does.
+    type: list[[str, bool, int]]
+    return: float
+    """
+    value = None
+    for operator, is_slot, number in factors:
+        if value is None:
+            value = float(number)
+        elif operator == '*':
+            value = value * number
+        else:
+            value = value / number
+    return value
+
+
+def fold_plan(plan):
+    """
+    param: Folds a plan into (whole, constant, terms). Every term is (sign, coefficient, factors) where factors
+    are the [operator, is_slot, value] factors left after the coefficient. whole says every term is a whole number
+    on every draw; then terms only hold '*' key slots, sorted, with like terms combined.
+    type: list[[str, [[str, bool, int]]]]
+    return: (bool, float, list[(str, float, list[[str, bool, int]]])
+    """
+    constants = [term_value(factors) if not any(is_slot for operator, is_slot, value in factors) else None
+                 for sign, factors in plan]
+    whole = all(value is None or value.is_integer() for value in constants) and \
+        not any(operator == '/' for (sign, factors), value in zip(plan, constants) if value is None
+                for operator, is_slot, number in factors[1:])
+    if whole:
+        constant = 0.0
+        coefficients = {}
+        for (sign, factors), value in zip(plan, constants):
+            if value is not None:
+                constant = constant + value if sign == '+' else constant - value
+                continue
+            coefficient = 1.0
+            columns = []
+            for operator, is_slot, number in factors:
+                if is_slot:
+                    columns.append(number)
+                else:
+                    coefficient *= number
+            columns = tuple(sorted(columns))
+            coefficients[columns] = coefficients.get(columns, 0.0) + (coefficient if sign == '+' else -coefficient)
+        terms = [('+', coefficient, [['*', True, column] for column in columns])
+                 for columns, coefficient in coefficients.items() if coefficient != 0]
+        return True, constant, terms
+    constant = 0.0
+    terms = []
+    for (sign, factors), value in zip(plan, constants):
+        if value is not None and not terms:
+            # Constant terms before the first key slot are added up in the same order eval adds them.
+            constant = constant + value if sign == '+' else constant - value
+        elif value is not None:
+            terms.append((sign, value, []))
+        else:
+            coefficient = None
+            position = 0
+            while not factors[position][1]:
+                coefficient = term_value(factors[:position + 1])
+                position += 1
+            first = factors[position]
+            rest = factors[position + 1:]
+            if coefficient is None:
+                terms.append((sign, 1.0, [['*', True, first[2]]] + rest))
+            else:
+                terms.append((sign, coefficient, [[first[0], True, first[2]]] + rest))
+    return False, constant, terms
+
+
+def evaluate_folded(folded, letters):
+    """
+    param: Evaluates a folded DNA for every row of drawn key letters, giving the same numbers as evaluate_plan.
+    type: (bool, float, list), numpy.ndarray (samples x keys)
+    return: numpy.ndarray (float, samples)
+    """
+    whole, constant, terms = folded
+    letters = asarray(letters, dtype=float64)
+    total = zeros(letters.shape[:-1]) + constant
+    for sign, coefficient, factors in terms:
+        term = coefficient
+        for operator, is_slot, value in factors:
+            factor = letters[..., value] if is_slot else value
+            term = term * factor if operator == '*' else term / factor
+        total = total + term if sign == '+' else total - term
+    return total
+
+
+def canonical_form(folded):
+    """
+    param: A form of a folded DNA that doesn't depend on how its key columns are numbered, and, for whole DNAs,
+    on the order of its terms and factors. DNAs with the same canonical form generate the same digits with the
+    same probabilities.
+    type: (bool, float, list)
+    return: tuple
+    """
+    whole, constant, terms = folded
+    order = []
+    if whole:
+        # Columns are numbered by the terms they appear in, which doesn't depend on their old numbers.
+        signatures = {}
+        for sign, coefficient, factors in terms:
+            for operator, is_slot, column in factors:
+                signatures.setdefault(column, []).append((coefficient, len(factors)))
+        order = sorted(signatures, key=lambda column: sorted(signatures[column]))
+    for sign, coefficient, factors in terms:
+        for operator, is_slot, value in factors:
+            if is_slot and value not in order:
+                order.append(value)
+    labels = {column: label for label, column in enumerate(order)}
+    canonical_terms = [(sign, coefficient, tuple((operator, is_slot, labels[value] if is_slot else value)
+                                                 for operator, is_slot, value in factors))
+                       for sign, coefficient, factors in terms]
+    if whole:
+        canonical_terms = sorted((sign, coefficient, tuple(sorted(factors)))
+                                 for sign, coefficient, factors in canonical_terms)
+    return whole, constant, tuple(canonical_terms)
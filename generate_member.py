@@ -1,8 +1,13 @@
+from genome import Genome
 from get_dna import get_dna
+from random_streams import use_stream
 
 
-def generate_member(member, gen_folder):
-    dna = get_dna(member)
-    with open(gen_folder + '/dna_' + str(member), 'w') as dna_file:
-        dna_file.write(str(dna))
-        dna_file.close()
+def generate_member(member, seed=None):
+    """
+    param: Worker task that generates a new healthy DNA for a member slot, drawing from the task's own seed.
+    type: int, numpy.random.SeedSequence
+    return: Genome
+    """
+    use_stream(seed)
+    return Genome.from_dna(get_dna(member))
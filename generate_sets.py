@@ -1,19 +1,83 @@
 #!/usr/bin/python
 
-from os import path
-from sys import argv
-from ast import literal_eval
+from multiprocessing import Pool
+from os import O_WRONLY, devnull, dup2, open as open_fd, path
+from sys import argv, stdout
 
-from calculate_digit import calculate_digit as cd
+from numpy import dtype
+from numpy.lib.format import write_array_header_1_0
+
+from create_sets import create_sets
+from genome import load_dna
+from random_streams import RandomStreams, use_stream
 import settings as S
 
 """
 This script gets a "DNA" file and generates a set of numbers based on the DNA.
+The sets are made in blocks of BLOCK_LINES lines, every block from its own seed, so the output is the same for a
+seed whatever the number of workers, and the blocks are written in order as they come in.
 type: str (path to file), int (number of sets to generate), int (number of digits in a set)
-returns: stdio (prints the generated sets)
+returns: stdio or a file (the generated sets, as CSV lines, raw little-endian int64 or a .npy array)
 """
 
-HELP = "Usage: python generate_sets.py --file=<DNA file path>\nOPTIONAL: --sets=<number of sets>\n          --digits=<number of digits in a set>"
+HELP = ("Usage: python generate_sets.py --file=<DNA file path>\nOPTIONAL: --sets=<number of sets>\n"
+        "          --digits=<number of digits in a set>\n"
+        "          --output=<file> (instead of stdout)\n"
+        "          --format=<csv|binary|npy> (csv by default, binary is raw little-endian int64 rows)\n"
+        "          --workers=<number of processes>\n"
+        "          --seed=<integer> (the same seed gives the same sets)")
+
+BLOCK_LINES = 10000
+FORMATS = ('csv', 'binary', 'npy')
+SET_DTYPE = dtype('<i8')
+
+
+def format_block(sets, output_format):
+    """
+    param: Turns a block of sets into the bytes that are written out.
+    type: numpy.ndarray (int, lines x digits), str
+    return: bytes
+    """
+    if output_format == 'csv':
+        # One format string for the whole block keeps the formatting out of a Python loop.
+        line = ','.join(['%d'] * sets.shape[1]) + '\n'
+        return ((line * sets.shape[0]) % tuple(sets.ravel().tolist())).encode()
+    return sets.astype(SET_DTYPE).tobytes()
+
+
+def generate_block(dna, lines, length, seed, output_format):
+    """
+    param: Worker task that creates and formats one block of sets from its own seed.
+    type: Genome or list[str,...,[int]], int, int, numpy.random.SeedSequence, str
+    return: bytes
+    """
+    use_stream(seed)
+    return format_block(create_sets(dna, lines, length), output_format)
+
+
+def generate_sets(dna, size, length, output, output_format='csv', workers=1, seed=None):
+    """
+    param: Writes `size` sets of `length` digits to a binary file object, block by block.
+    type: Genome or list[str,...,[int]], int, int, file, str, int, int
+    return: None
+    """
+    streams = RandomStreams(seed)
+    tasks = [(dna, min(BLOCK_LINES, size - start), length, streams.task_seed('sets', block), output_format)
+             for block, start in enumerate(range(0, size, BLOCK_LINES))]
+    if output_format == 'npy':
+        write_array_header_1_0(output, {'descr': SET_DTYPE.str, 'fortran_order': False, 'shape': (size, length)})
+    if workers > 1:
+        with Pool(processes=workers) as pool:
+            for block in pool.imap(_generate_block, tasks):
+                output.write(block)
+    else:
+        for task in tasks:
+            output.write(generate_block(*task))
+    output.flush()
+
+
+def _generate_block(arguments):
+    return generate_block(*arguments)
 
 
 def main():
@@ -25,33 +89,51 @@ def main():
         print(HELP)
         return
 
+    dna_file = None
+    output_file = None
+    output_format = 'csv'
+    workers = 1
+    seed = None
     size = S.SET_SIZE
     length = S.SET_LENGTH
 
-    for arg in argv[1:32]:
+    for arg in argv[1:]:
         if "--file=" in arg:
             dna_file = arg.split("=")[1]
-            if not path.exists(dna_file):
-                print("File does not exist: ", dna_file)
-                return
+        elif "--sets=" in arg:
+            size = int(arg.split("=")[1])
+        elif "--digits=" in arg:
+            length = int(arg.split("=")[1])
+        elif "--output=" in arg:
+            output_file = arg.split("=")[1]
+        elif "--format=" in arg:
+            output_format = arg.split("=")[1]
+        elif "--workers=" in arg:
+            workers = int(arg.split("=")[1])
+        elif "--seed=" in arg:
+            seed = int(arg.split("=")[1])
         else:
             print(HELP)
             return
-        if "--sets=" in arg:
-            size = int(arg.split("=")[1])
-        if "--digits=" in arg:
-            length = int(arg.split("=")[1])
 
-    dna = []
-    with open(dna_file, "r") as f:
-        dna = literal_eval(f.read())
-    f.close()
+    if dna_file is None or output_format not in FORMATS:
+        print(HELP)
+        return
+    if not path.exists(dna_file):
+        print("File does not exist: ", dna_file)
+        return
 
-    for i in range(size):
-        line = ""
-        for j in range(length):
-            line += str(cd.calculate_digit(dna)) + ","
-        print(line[:-1])
+    dna = load_dna(dna_file)
+
+    if output_file is not None:
+        with open(output_file, 'wb') as output:
+            generate_sets(dna, size, length, output, output_format, workers, seed)
+        return
+    try:
+        generate_sets(dna, size, length, stdout.buffer, output_format, workers, seed)
+    except BrokenPipeError:
+        # The reader stopped early (e.g. piped into head), which is fine. Nothing is left to flush to it.
+        dup2(open_fd(devnull, O_WRONLY), stdout.fileno())
 
 
 if __name__ == "__main__":
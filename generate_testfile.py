@@ -1,13 +1,25 @@
 #!/usr/bin/python
 
 import settings as S
-from random import randint
-
-with open('./test.csv', 'w') as f:
-    for i in range(S.SET_SIZE):
-        line = []
-        for j in range(S.SET_LENGTH):
-            line.append(str(randint(S.MINIMUM_DIGIT, S.MAXIMUM_DIGIT)))
-        line.pop()
-        f.write(','.join(line) + '\n')
-f.close()
+from random_streams import RandomStream
+
+
+def generate_testfile(test_file='./test.csv', lines=None, seed=None):
+    """
+    param: Writes a test file of random sets, SET_SIZE lines unless told otherwise. A seed gives the same file
+    every time.
+    type: str, int, int
+    return: None
+    """
+    lines = S.SET_SIZE if lines is None else lines
+    stream = RandomStream(seed)
+    with open(test_file, 'w') as f:
+        for i in range(lines):
+            line = [str(digit) for digit in stream.randint(S.MINIMUM_DIGIT, S.MAXIMUM_DIGIT, S.SET_LENGTH)]
+            line.pop()
+            f.write(','.join(line) + '\n')
+    f.close()
+
+
+if __name__ == '__main__':
+    generate_testfile()
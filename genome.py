@@ -0,0 +1,190 @@
+from array import array
+from ast import literal_eval
+from struct import calcsize, pack, unpack_from
+from sys import byteorder
+
+import settings as S
+
+GENOME_VERSION = 1
+HEADER = '<BHH'  # Version, number of letters, number of key slots.
+LARGEST_LETTER = 255  # Letters are stored as bytes.
+
+
+def is_letter(token):
+    """
+    param: Whether a DNA token is a letter: a whole number written the way str() writes it, since eval turns
+    down forms like '07'.
+    type: str
+    return: bool
+    """
+    return isinstance(token, str) and token.isdecimal() and str(int(token)) == token
+
+
+def little_endian(key):
+    """
+    param: A copy of a key array in little-endian byte order, the order of the binary encoding on every host.
+    Swapping is its own inverse, so this also reads an encoded key back.
+    type: array('H')
+    return: array('H')
+    """
+    key = array('H', key)
+    if byteorder == 'big':
+        key.byteswap()
+    return key
+
+
+class Genome:
+    """
+    A DNA packed into arrays: the letters as small ints, the operators as 2-bit codes (their index in
+    S.OPERATORS, 4 to a byte) and the key as the letter positions that are randomly drawn, in key order.
+    Only well-formed DNAs fit: letters and operators alternate and the key only points at letters.
+    """
+    __slots__ = ('letters', 'operators', 'key')
+
+    def __init__(self, letters, operators, key):
+        """
+        param: Builds a genome from its arrays, see from_dna for building one from a DNA list.
+        type: array('B'), bytes, array('H')
+        return: None
+        """
+        self.letters = letters
+        self.operators = operators
+        self.key = key
+
+    @classmethod
+    def from_dna(cls, dna):
+        """
+        param: Packs a DNA list, raising ValueError if it isn't a clean letter/operator alternation.
+        type: list[str,...,[int]]
+        return: Genome
+        """
+        tokens = dna[:-1]
+        if len(tokens) % 2 == 0:
+            raise ValueError("DNA must start and end with a letter")
+        letters = array('B')
+        codes = []
+        for index, token in enumerate(tokens):
+            if index % 2 == 0:
+                if not is_letter(token) or int(token) > LARGEST_LETTER:
+                    raise ValueError("Not a letter at index " + str(index) + ": " + repr(token))
+                letters.append(int(token))
+            else:
+                if token not in S.OPERATORS:
+                    raise ValueError("Not an operator at index " + str(index) + ": " + repr(token))
+                codes.append(S.OPERATORS.index(token))
+        key = array('H')
+        for index in dna[-1]:
+            if index % 2 == 1 or not 0 <= index < len(tokens):
+                raise ValueError("Key index is not a letter: " + str(index))
+            key.append(index // 2)
+        operators = bytearray((len(codes) + 3) // 4)
+        for position, code in enumerate(codes):
+            operators[position // 4] |= code << (2 * (position % 4))
+        return cls(letters, bytes(operators), key)
+
+    def operator_codes(self):
+        """
+        param: Unpacks the 2-bit operator codes.
+        type: None
+        return: list[int]
+        """
+        return [(self.operators[position // 4] >> (2 * (position % 4))) & 3
+                for position in range(len(self.letters) - 1)]
+
+    def to_dna(self):
+        """
+        param: Unpacks the genome back to the DNA list format.
+        type: None
+        return: list[str,...,[int]]
+        """
+        dna = []
+        for letter, code in zip(self.letters, self.operator_codes() + [None]):
+            dna.append(str(letter))
+            if code is not None:
+                dna.append(S.OPERATORS[code])
+        dna.append([position * 2 for position in self.key])
+        return dna
+
+    def to_bytes(self):
+        """
+        param: Encodes the genome: a small header, one byte per letter, the packed operators, then the key.
+        Everything is little-endian, so the encoding reads the same on every host.
+        type: None
+        return: bytes
+        """
+        return (pack(HEADER, GENOME_VERSION, len(self.letters), len(self.key)) + self.letters.tobytes() +
+                self.operators + little_endian(self.key).tobytes())
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """
+        param: Decodes a genome written by to_bytes, starting at offset.
+        type: bytes, int
+        return: Genome
+        """
+        version, letters_count, key_count = unpack_from(HEADER, data, offset)
+        if version != GENOME_VERSION:
+            raise ValueError("Unknown genome version: " + str(version))
+        offset += calcsize(HEADER)
+        letters = array('B', data[offset:offset + letters_count])
+        offset += letters_count
+        operators_size = (letters_count + 2) // 4
+        operators = bytes(data[offset:offset + operators_size])
+        offset += operators_size
+        key = array('H')
+        key.frombytes(data[offset:offset + 2 * key_count])
+        return cls(letters, operators, little_endian(key))
+
+    def __reduce__(self):
+        # Genomes travel to the pool workers as their binary encoding.
+        return (Genome.from_bytes, (self.to_bytes(),))
+
+    def __eq__(self, other):
+        return isinstance(other, Genome) and self.to_bytes() == other.to_bytes()
+
+    def __hash__(self):
+        return hash(self.to_bytes())
+
+    def __len__(self):
+        return len(self.letters)
+
+    def __repr__(self):
+        return 'Genome(' + str(self.to_dna()) + ')'
+
+
+def as_dna(dna):
+    """
+    param: Returns the DNA list of a genome, or the DNA itself if it already is a list.
+    type: Genome or list[str,...,[int]]
+    return: list[str,...,[int]]
+    """
+    if isinstance(dna, Genome):
+        return dna.to_dna()
+    return dna
+
+
+def pack_dna(dna):
+    """
+    param: Packs a DNA into a Genome when it is well-formed, otherwise returns the DNA list unchanged.
+    type: list[str,...,[int]] or Genome
+    return: Genome or list[str,...,[int]]
+    """
+    if isinstance(dna, Genome):
+        return dna
+    try:
+        return Genome.from_dna(dna)
+    except (ValueError, AttributeError, TypeError):
+        return dna
+
+
+def load_dna(dna_path):
+    """
+    param: Reads a DNA file, either a binary genome or the text format of the generation folders.
+    type: str
+    return: Genome or list[str,...,[int]]
+    """
+    with open(dna_path, 'rb') as dna_file:
+        data = dna_file.read()
+    if data[:1] == b'[':
+        return literal_eval(data.decode())
+    return Genome.from_bytes(data)
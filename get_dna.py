@@ -1,6 +1,6 @@
-from random import randint, getrandbits
-
 from is_valid import is_valid
+from metrics import count
+from random_streams import get_stream
 import settings as S
 
 
@@ -10,20 +10,27 @@ def get_dna(member):
     type: int
     return: list[str,...,[int]]
     """
+    stream = get_stream()
     while True:
         dna = []
         key = []
-        dna_length = randint(S.DNA_MIN_LENGTH, S.DNA_MAX_LENGTH)
+        dna_length = stream.randint(S.DNA_MIN_LENGTH, S.DNA_MAX_LENGTH)
+        chances = stream.randint(1, 100, dna_length)
+        digits = stream.randint(S.MINIMUM_LETTER_VALUE, S.MAXIMUM_LETTER_VALUE, dna_length)
+        operators = stream.randint(0, len(S.OPERATORS) - 1, dna_length)
         for letter in range(dna_length):
             if letter % 2 == 0:
-                if randint(1, 100) <= S.RANDOM_CHANCE:
+                if chances[letter] <= S.RANDOM_CHANCE:
                     key.append(letter)  # The letter at this index would later be randomly generated.
-            digit = randint(S.MINIMUM_LETTER_VALUE, S.MAXIMUM_LETTER_VALUE)
-            dna.append(str(digit))  # Saving as a string S. we can use eval later.
-            operator = S.OPERATORS[getrandbits(2)]
-            dna.append(operator)
+            dna.append(str(digits[letter]))  # Saving as a string S. we can use eval later.
+            dna.append(S.OPERATORS[operators[letter]])
         dna.pop()  # Last element is an operator and we want to remove it now.
+        if len(key) < 2:
+            continue  # is_valid would turn it down anyway, don't even ask.
         dna.append(key)
         if is_valid(dna):
-            print("Generated DNA: " + str(member + 1) + " out of: " + str(S.POPULATION_SIZE))
+            count('dnas_generated')
+            if not S.QUIET:
+                print("Generated DNA: " + str(member + 1) + " out of: " + str(S.POPULATION_SIZE))
             return dna
+        count('is_valid_rejections')
@@ -1,21 +1,17 @@
+from numpy import argsort, asarray
+
 import settings as S
 
 
-def get_top_scores(current_gen_folder):
+def get_top_scores(dna_scores, count=None):
     """
-    param: Returns a list of indices of the top DNAs in a generation.
-    type: str
+    param: Returns the indices of the top `count` DNAs of a generation (ASCENDING percent of them by default),
+    best first. Equal scores keep their member order, so the lower index ranks first.
+    type: list[int] or numpy.ndarray, int
     return: list[int]
     """
-    # We need to keep the top score and its index.
-    temp_top_scores = []
-    for member in range(S.POPULATION_SIZE):
-        with open(current_gen_folder + '/dna_' + str(member) + '_mean', 'r') as mean_file:
-            mean = mean_file.read()
-            mean_file.close()
-        temp_top_scores.append(int(mean))
-    top_scores = []
-    for top_score in range(S.POPULATION_SIZE):
-        top_scores.append(temp_top_scores.index(max(temp_top_scores)))
-        temp_top_scores[temp_top_scores.index(max(temp_top_scores))] = 0
-    return top_scores
+    dna_scores = asarray(dna_scores)
+    if count is None:
+        count = max(1, S.ASCENDING * len(dna_scores) // 100)
+    # A stable sort of the negated scores puts the best first and leaves ties in index order.
+    return argsort(-dna_scores, kind='stable')[:count].tolist()
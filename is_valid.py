@@ -1,25 +1,79 @@
+from math import log
+
+from numpy import bincount, count_nonzero, zeros
+
 import settings as S
-from calculate_digit import calculate_digit as cd
+from batch_digits import compile_batch
+from compile_dna import compile_dna
+from dna_distribution import build_distribution, expected_health
+
+
+def sequential_test(hits, misses, repeats):
+    """
+    param: Wald's sequential probability ratio test on the tests so far. The allowed miss rate is what SET_HEALTH
+    leaves after the repeated digits that will be taken off the health anyway.
+    type: int, int, int
+    return: bool (accept) or None (keep testing)
+    """
+    allowed_miss_rate = 1 - (S.SET_HEALTH + repeats) / S.SET_SIZE
+    if allowed_miss_rate <= 0:
+        return False
+    good_rate = allowed_miss_rate / S.VALIDITY_SPRT_RATIO
+    bad_rate = min(allowed_miss_rate * S.VALIDITY_SPRT_RATIO, 0.5 + allowed_miss_rate / 2)
+    ratio = misses * log(bad_rate / good_rate) + hits * log((1 - bad_rate) / (1 - good_rate))
+    if ratio >= log((1 - S.VALIDITY_ERROR_RATE) / S.VALIDITY_ERROR_RATE):
+        return False
+    if ratio <= log(S.VALIDITY_ERROR_RATE / (1 - S.VALIDITY_ERROR_RATE)):
+        return True
+    return None
 
 
 def is_valid(dna):
     """
-    param: returns a bool for DNA health.
+    param: returns a bool for DNA health. Stops as soon as the remaining tests can no longer reach SET_HEALTH,
+    or when VALIDITY_SPRT is on, as soon as the sequential test decides. With DISTRIBUTION_SAMPLING, a DNA that
+    gets through its first chunk of tests has its health worked out from its distribution when it can be built.
     type: dna: list[str,...,[int]]
     return: bool
     """
-    test_dna = dna.copy()
-    key = test_dna[len(test_dna)-1]
+    key = dna[len(dna)-1]
+    if len(key)-1 <= 0:
+        return False
+    if S.BATCH_EVALUATION:
+        evaluate = compile_batch(dna)
+        results = zeros(S.MAXIMUM_DIGIT + 1, dtype=int)
+        health = 0
+        tested = 0
+        while tested < S.SET_SIZE:
+            digits = evaluate(min(S.VALIDITY_CHUNK, S.SET_SIZE - tested))
+            tested += len(digits)
+            in_range = digits[(digits >= S.MINIMUM_DIGIT) & (digits <= S.MAXIMUM_DIGIT)].astype(int)
+            health += len(in_range)
+            results += bincount(in_range, minlength=S.MAXIMUM_DIGIT + 1)
+            if health + S.SET_SIZE - tested < S.SET_HEALTH:
+                return False
+            if S.DISTRIBUTION_SAMPLING and tested == len(digits):
+                # Building the distribution costs more than a chunk, so only DNAs that aren't hopeless get one.
+                distribution = build_distribution(dna)
+                if distribution is not None:
+                    return expected_health(distribution) >= S.SET_HEALTH
+            if S.VALIDITY_SPRT and tested < S.SET_SIZE:
+                decision = sequential_test(health, tested - health, count_nonzero(results[:-1] > 1))
+                if decision is not None:
+                    return decision
+        if results.sum() > S.SET_HEALTH:
+            health -= count_nonzero(results[:-1] > 1)
+        return bool(health >= S.SET_HEALTH)
+    cd = compile_dna(dna)
     results = [0] * (S.MAXIMUM_DIGIT + 1)  # Part of the health-check is to see how many repetitions we got.
     health = 0
     for item in range(S.SET_SIZE):
-        if len(key)-1 > 0:
-            result = cd(test_dna)
-        else:
-            return False
+        result = cd()
         if result >= S.MINIMUM_DIGIT and result <= S.MAXIMUM_DIGIT:
             health += 1
             results[result] += 1
+        elif health + S.SET_SIZE - item - 1 < S.SET_HEALTH:
+            return False
     if sum(results) > S.SET_HEALTH:
         for index in range(len(results) - 1):
             if results[index] > 1:
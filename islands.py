@@ -0,0 +1,284 @@
+from ipaddress import ip_address
+from multiprocessing import AuthenticationError, current_process
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge, wait
+from os import environ, path
+from socket import AF_INET, SOCK_STREAM, SOL_SOCKET, SO_RCVTIMEO, fromfd
+from struct import calcsize, error as StructError, pack, unpack_from
+from time import sleep, time
+
+from genome import Genome
+import settings as S
+
+"""
+Island mode: several populations evolve side by side, and every MIGRATION_EVERY generations each island sends its
+top MIGRANTS genomes to a coordinator, which hands every island the migrants of the island before it in the ring.
+The coordinator and the islands talk over authenticated multiprocessing connections, so islands can run on other
+hosts too. Messages are plain bytes, never pickles, so a peer can't make the other side run code:
+hello (island, generation of its first exchange, MIGRATION_EVERY), welcome or refused (reason),
+migrants (generation, genomes in their binary encoding) and done.
+"""
+
+AUTHKEY_VARIABLE = 'BETTER_ISLAND_AUTHKEY'
+HELLO = '<ciii'  # b'H', island, generation of the first exchange, MIGRATION_EVERY.
+MIGRANTS = '<ci'  # b'M', generation, then the genomes.
+LENGTH = '<I'
+
+
+def parse_address(address):
+    """
+    param: Turns "host:port" into the address the connections use.
+    type: str
+    return: (str, int)
+    """
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+def is_loopback(host):
+    """
+    param: Whether a host only reaches this machine. Host names other than localhost count as reachable from
+    elsewhere.
+    type: str
+    return: bool
+    """
+    if host == 'localhost':
+        return True
+    try:
+        return ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def shared_authkey(authkey=None):
+    """
+    param: The key set for the coordinator and its islands: authkey, else ISLAND_AUTHKEY (--authkey=), else the
+    BETTER_ISLAND_AUTHKEY environment variable, None when none is set.
+    type: bytes or str
+    return: bytes or None
+    """
+    if authkey is None:
+        authkey = S.ISLAND_AUTHKEY
+    if authkey is None:
+        authkey = environ.get(AUTHKEY_VARIABLE) or None
+    if isinstance(authkey, str):
+        authkey = authkey.encode()
+    return authkey
+
+
+def island_authkey(authkey=None):
+    """
+    param: The key the connections are authenticated with: the shared key, or without one the random key of this
+    process, which the coordinator and island processes one better.py starts inherit. The connections are
+    never left unauthenticated.
+    type: bytes or str
+    return: bytes
+    """
+    shared = shared_authkey(authkey)
+    return current_process().authkey if shared is None else shared
+
+
+def receive_timeout(connection, seconds):
+    """
+    param: Makes reads on a connection fail with an OSError after `seconds` without data, 0 waits forever again.
+    type: multiprocessing.connection.Connection, float
+    return: None
+    """
+    connection_socket = fromfd(connection.fileno(), AF_INET, SOCK_STREAM)
+    connection_socket.setsockopt(SOL_SOCKET, SO_RCVTIMEO, pack('ll', int(seconds), int(seconds % 1 * 1000000)))
+    connection_socket.close()
+
+
+def accept_island(listener, authkey):
+    """
+    param: Accepts a connection and reads its hello. The handshake and the hello must come within
+    ISLAND_CONNECT_TIMEOUT seconds, so a peer that stays silent can't hold up the islands behind it.
+    Raises AuthenticationError, OSError, EOFError or struct.error for a peer that doesn't qualify.
+    type: multiprocessing.connection.Listener, bytes
+    return: multiprocessing.connection.Connection, (bytes, int, int, int) (the hello)
+    """
+    connection = listener.accept()
+    try:
+        receive_timeout(connection, S.ISLAND_CONNECT_TIMEOUT)
+        # The handshake Listener.accept does with an authkey, here under the timeout.
+        deliver_challenge(connection, authkey)
+        answer_challenge(connection, authkey)
+        hello = unpack_from(HELLO, connection.recv_bytes(calcsize(HELLO)))
+        receive_timeout(connection, 0)
+    except BaseException as error:
+        connection.close()
+        if isinstance(error, BlockingIOError):
+            raise OSError("No handshake and hello within " + str(S.ISLAND_CONNECT_TIMEOUT) + " seconds") from error
+        raise
+    return connection, hello
+
+
+def island_file(file_name, island):
+    """
+    param: The name an island gives a run file (history, checkpoint folder, ...), so islands don't share them.
+    type: str, int
+    return: str
+    """
+    root, extension = path.splitext(file_name)
+    return root + '-island-' + str(island) + extension
+
+
+def first_exchange(generation):
+    """
+    param: The first generation an island that starts at `generation` swaps migrants after.
+    type: int
+    return: int
+    """
+    return generation + (-(generation + 1)) % S.MIGRATION_EVERY
+
+
+def pack_genomes(genomes):
+    """
+    param: Encodes genomes one after the other, each behind its length.
+    type: list[Genome]
+    return: bytes
+    """
+    encoded = [genome.to_bytes() for genome in genomes]
+    return b''.join(pack(LENGTH, len(genome)) + genome for genome in encoded)
+
+
+def unpack_genomes(data, offset=0):
+    """
+    param: Decodes the genomes pack_genomes wrote, starting at offset.
+    type: bytes, int
+    return: list[Genome]
+    """
+    genomes = []
+    while offset < len(data):
+        size, = unpack_from(LENGTH, data, offset)
+        offset += calcsize(LENGTH)
+        genomes.append(Genome.from_bytes(data[offset:offset + size]))
+        offset += size
+    return genomes
+
+
+def run_coordinator(address, islands, authkey=None):
+    """
+    param: Waits for `islands` islands to connect and passes their migrants around the ring until they are all
+    done. The islands must agree on the generation of their first exchange and on MIGRATION_EVERY, else they are
+    all refused, since they would wait for each other forever. A generation's migrants go out once every island
+    still running has sent its own; an island that drops its connection counts as done. Refuses to listen
+    beyond this host without a shared key, and turns down a second island with the same number.
+    type: (str, int), int, bytes
+    return: None
+    """
+    if shared_authkey(authkey) is None and not is_loopback(address[0]):
+        raise ValueError("A coordinator listening on " + address[0] + " needs a shared key: --authkey=<key> or " +
+                         AUTHKEY_VARIABLE)
+    authkey = island_authkey(authkey)
+    # No authkey here: accept_island does the handshake itself, under a timeout.
+    with Listener(address) as listener:
+        connections = {}
+        schedules = {}
+        while len(connections) < islands:
+            try:
+                connection, (kind, island, generation, every) = accept_island(listener, authkey)
+            except (AuthenticationError, OSError, EOFError, StructError) as error:
+                print("Turned down a connection: " + str(error))
+                continue
+            if kind != b'H' or island in connections:
+                reason = "Not a hello" if kind != b'H' else "Island " + str(island) + " already joined"
+                print("Turned down a connection: " + reason)
+                connection.send_bytes(b'R' + reason.encode())
+                connection.close()
+                continue
+            connections[island] = connection
+            schedules[island] = (generation, every)
+            print("Island " + str(island) + " joined.")
+        if len(set(schedules.values())) > 1:
+            reason = "Islands don't exchange at the same generations (first exchange, every): " + str(schedules)
+            print(reason)
+            for connection in connections.values():
+                connection.send_bytes(b'R' + reason.encode())
+                connection.close()
+            return
+        for connection in connections.values():
+            connection.send_bytes(b'W')
+        pending = {}
+        while connections:
+            for connection in wait(list(connections.values())):
+                island = [island for island in connections if connections[island] is connection][0]
+                try:
+                    message = connection.recv_bytes()
+                except (EOFError, OSError):
+                    message = b'D'
+                if message[:1] == b'M':
+                    generation = unpack_from(MIGRANTS, message)[1]
+                    pending.setdefault(generation, {})[island] = message
+                else:
+                    connection.close()
+                    del connections[island]
+            for generation in sorted(pending):
+                if not set(connections) <= set(pending[generation]):
+                    continue
+                ring = sorted(pending[generation])
+                for position, island in enumerate(ring):
+                    if island in connections:
+                        connections[island].send_bytes(pending[generation][ring[position - 1]])
+                del pending[generation]
+
+
+class IslandLink:
+    """
+    An island's connection to the coordinator. It joins once the island knows which generation it starts at.
+    """
+
+    def __init__(self, address, island, authkey=None):
+        """
+        param: A link of island to the coordinator at address, not connected yet.
+        type: (str, int), int, bytes
+        return: None
+        """
+        self.address = address
+        self.island = island
+        self.authkey = island_authkey(authkey)
+        self.connection = None
+
+    def join(self, generation):
+        """
+        param: Connects to the coordinator, retrying for ISLAND_CONNECT_TIMEOUT seconds while it starts up, and
+        waits until every island has joined. Raises RuntimeError if the coordinator refuses the island.
+        type: int (the first generation this island evolves)
+        return: None
+        """
+        start = time()
+        while True:
+            try:
+                self.connection = Client(self.address, authkey=self.authkey)
+                break
+            except ConnectionRefusedError:
+                if time() - start > S.ISLAND_CONNECT_TIMEOUT:
+                    raise
+                sleep(0.1)
+        self.connection.send_bytes(pack(HELLO, b'H', self.island, first_exchange(generation), S.MIGRATION_EVERY))
+        reply = self.connection.recv_bytes()
+        if reply[:1] != b'W':
+            raise RuntimeError("The coordinator refused island " + str(self.island) + ": " + reply[1:].decode())
+
+    def exchange(self, generation, migrants):
+        """
+        param: Sends the island's migrants for a generation and waits for the ones it gets in return.
+        type: int, list[Genome]
+        return: list[Genome]
+        """
+        self.connection.send_bytes(pack(MIGRANTS, b'M', generation) + pack_genomes(migrants))
+        return unpack_genomes(self.connection.recv_bytes(), calcsize(MIGRANTS))
+
+    def leave(self):
+        """
+        param: Tells the coordinator the island is done, if it is still connected.
+        type: None
+        return: None
+        """
+        if self.connection is None:
+            return
+        try:
+            self.connection.send_bytes(b'D')
+        except OSError:
+            pass
+        self.connection.close()
+        self.connection = None
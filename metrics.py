@@ -0,0 +1,196 @@
+from collections import Counter
+from contextlib import contextmanager
+from json import dumps
+from os import replace
+import signal
+from sys import _getframe
+from time import perf_counter, process_time, time
+
+import settings as S
+
+"""
+Run metrics. Counters are kept per process with count(); the scheduler sends the workers' counts back with their
+results, so the parent ends up with the counts of the whole run. Metrics adds the wall and CPU time of every stage
+of a generation and writes one record per generation to METRICS_FILE.
+"""
+
+_COUNTERS = Counter()
+
+
+def count(name, amount=1):
+    """
+    param: Adds to one of this process's counters.
+    type: str, int or float
+    return: None
+    """
+    _COUNTERS[name] += amount
+
+
+def take_counters():
+    """
+    param: Returns this process's counters and starts them over.
+    type: None
+    return: dict
+    """
+    counters = dict(_COUNTERS)
+    _COUNTERS.clear()
+    return counters
+
+
+def add_counters(counters):
+    """
+    param: Adds counters taken in another process to this process's counters.
+    type: dict
+    return: None
+    """
+    _COUNTERS.update(counters)
+
+
+class SamplingProfiler:
+    """
+    Samples the call stack of this process every `interval` seconds of CPU time (SIGPROF) and counts the stacks,
+    in the folded format flame graph tools read ("file:function;file:function count"). Stacks start at the
+    function that started the profiler.
+    """
+
+    def __init__(self, interval=None):
+        """
+        param: A profiler that samples every interval seconds, PROFILE_INTERVAL by default.
+        type: float
+        return: None
+        """
+        self.interval = S.PROFILE_INTERVAL if interval is None else interval
+        self.samples = Counter()
+        self.old_handler = None
+        self.base = 0
+
+    def sample(self, signal_number, frame):
+        """
+        param: SIGPROF handler, counts the stack the process was in.
+        type: int, frame
+        return: None
+        """
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code.co_filename.rsplit('/', 1)[-1] + ':' + frame.f_code.co_name)
+            frame = frame.f_back
+        self.samples[';'.join(stack[::-1][self.base:])] += 1
+
+    def start(self):
+        """
+        param: Starts sampling, replacing whatever handled SIGPROF until stop().
+        type: None
+        return: None
+        """
+        frame = _getframe(2)
+        self.base = 0
+        while frame is not None:
+            self.base += 1
+            frame = frame.f_back
+        self.old_handler = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        """
+        param: Stops sampling.
+        type: None
+        return: Counter (samples by folded stack)
+        """
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.old_handler)
+        return self.samples
+
+    def save(self, profile_file, worker_samples=None):
+        """
+        param: Writes the samples, most frequent stack first, under 'parent' and the workers' samples (as the
+        scheduler collected them) under 'workers'.
+        type: str, Counter
+        return: None
+        """
+        samples = Counter({'parent;' + stack: count for stack, count in self.samples.items()})
+        samples.update({'workers;' + stack: count for stack, count in (worker_samples or {}).items()})
+        with open(profile_file, 'w') as profile:
+            for stack, count in samples.most_common():
+                profile.write(stack + ' ' + str(count) + '\n')
+
+
+class Metrics:
+    """
+    Collects the stages and counters of a generation and writes them out as one JSON line per generation, or as
+    a Prometheus text file that is replaced every generation (counters are totals since the run started).
+    """
+
+    def __init__(self, metrics_file=None, metrics_format=None):
+        """
+        param: Metrics that go to metrics_file (METRICS_FILE by default, None writes nothing) in metrics_format
+        ('jsonl' or 'prometheus', METRICS_FORMAT by default).
+        type: str, str
+        return: None
+        """
+        self.metrics_file = S.METRICS_FILE if metrics_file is None else metrics_file
+        self.metrics_format = S.METRICS_FORMAT if metrics_format is None else metrics_format
+        self.stages = {}
+        self.totals = Counter()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        param: Times a stage of the generation, e.g. with metrics.stage('evaluate'): ... The parent's CPU time
+        is measured here, the workers' CPU time arrives as the '<stage>_worker_cpu_seconds' counters.
+        type: str
+        return: None
+        """
+        wall = perf_counter()
+        cpu = process_time()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, [0.0, 0.0])
+            stage[0] += perf_counter() - wall
+            stage[1] += process_time() - cpu
+
+    def wall(self, name):
+        """
+        param: Wall time of a stage of this generation so far.
+        type: str
+        return: float
+        """
+        return self.stages.get(name, [0.0, 0.0])[0]
+
+    def end_generation(self, generation):
+        """
+        param: Writes the generation's record and starts the next generation with no stages.
+        type: int
+        return: dict (the record)
+        """
+        counters = take_counters()
+        self.totals.update(counters)
+        record = {'generation': generation, 'time': time(),
+                  'stages': {name: {'wall': wall, 'cpu': cpu} for name, (wall, cpu) in self.stages.items()},
+                  'counters': counters}
+        self.stages = {}
+        if self.metrics_file is None:
+            return record
+        if self.metrics_format == 'prometheus':
+            self.write_prometheus(record)
+        else:
+            with open(self.metrics_file, 'a') as metrics:
+                metrics.write(dumps(record) + '\n')
+        return record
+
+    def write_prometheus(self, record):
+        """
+        param: Replaces the metrics file with the record in the Prometheus text format.
+        type: dict
+        return: None
+        """
+        lines = ['# TYPE better_generation gauge', 'better_generation ' + str(record['generation'])]
+        for kind in ('wall', 'cpu'):
+            lines.append('# TYPE better_stage_' + kind + '_seconds gauge')
+            lines += ['better_stage_' + kind + '_seconds{stage="' + name + '"} ' + repr(stage[kind])
+                      for name, stage in record['stages'].items()]
+        for name, total in sorted(self.totals.items()):
+            lines += ['# TYPE better_' + name + '_total counter', 'better_' + name + '_total ' + repr(total)]
+        with open(self.metrics_file + '.tmp', 'w') as metrics:
+            metrics.write('\n'.join(lines) + '\n')
+        replace(self.metrics_file + '.tmp', self.metrics_file)
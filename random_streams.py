@@ -0,0 +1,103 @@
+from numpy.random import SeedSequence, default_rng
+
+import settings as S
+
+# Every kind of task draws from its own branch of the run's seed.
+STAGES = ('parent', 'generate', 'assess', 'sets')
+
+_STREAM = None
+
+
+class RandomStream:
+    """
+    One independent random stream. Small integers are served from buffers drawn RANDOM_BUFFER at a time,
+    anything bigger comes from the numpy generator itself.
+    """
+
+    def __init__(self, seed=None):
+        """
+        param: Starts a stream from a seed sequence (or anything numpy takes as a seed), fresh entropy by default.
+        type: numpy.random.SeedSequence or int
+        return: None
+        """
+        self.generator = default_rng(seed)
+        self.buffers = {}
+
+    def randint(self, low, high, count=None):
+        """
+        param: Like random.randint, one integer between low and high (both included), or a list of count of them.
+        type: int, int, int
+        return: int or list[int]
+        """
+        buffer = self.buffers.setdefault((low, high), [])
+        wanted = 1 if count is None else count
+        while len(buffer) < wanted:
+            buffer[:0] = self.generator.integers(low, high, size=max(S.RANDOM_BUFFER, wanted), endpoint=True).tolist()
+        values = buffer[len(buffer) - wanted:]
+        del buffer[len(buffer) - wanted:]
+        return values[0] if count is None else values
+
+
+class RandomStreams:
+    """
+    The random streams of a run, all spawned from one seed: a generator for the parent process, and a seed for
+    every task made from the stage, generation, member and round it belongs to. Tasks therefore draw the same
+    numbers whichever worker runs them and in whatever order, which makes a seeded run reproducible.
+    """
+
+    def __init__(self, seed=None, island=None):
+        """
+        param: Streams of a run seeded with seed (fresh entropy if None). Islands get streams of their own.
+        type: int, int
+        return: None
+        """
+        self.seed = SeedSequence(seed).entropy
+        self.island = () if island is None else (island,)
+        self.generator = default_rng(self.task_seed('parent'))
+
+    def task_seed(self, stage, *numbers):
+        """
+        param: The seed of one task, e.g. task_seed('assess', generation, member, round).
+        type: str, int...
+        return: numpy.random.SeedSequence
+        """
+        return SeedSequence(self.seed, spawn_key=self.island + (STAGES.index(stage),) + numbers)
+
+    def state(self):
+        """
+        param: What a checkpoint needs to carry the streams on: the run's seed and the parent generator's state.
+        type: None
+        return: (int, dict)
+        """
+        return self.seed, self.generator.bit_generator.state
+
+    def restore(self, state):
+        """
+        param: Picks the streams up from a checkpoint's state.
+        type: (int, dict)
+        return: None
+        """
+        self.seed, generator_state = state
+        self.generator.bit_generator.state = generator_state
+
+
+def use_stream(seed=None):
+    """
+    param: Makes a new stream this process's current stream, e.g. at the start of a task.
+    type: numpy.random.SeedSequence or int
+    return: RandomStream
+    """
+    global _STREAM
+    _STREAM = RandomStream(seed)
+    return _STREAM
+
+
+def get_stream():
+    """
+    param: This process's current stream, a freshly seeded one if no task has set one.
+    type: None
+    return: RandomStream
+    """
+    if _STREAM is None:
+        return use_stream()
+    return _STREAM
@@ -0,0 +1,245 @@
+#!/usr/bin/python
+
+from os import path
+from struct import calcsize, pack, unpack_from
+from sys import argv
+
+from numpy import array, asarray, int64, memmap, uint8, zeros
+
+from genome import Genome
+from metrics import count
+import settings as S
+
+"""
+The run history keeps every generation of a run in one append-only file: a block per generation with the packed
+genomes, their score statistics, parents and crossover donors, and the raw sets HISTORY_SETS says to keep.
+Reading it memory-maps the file and only touches the blocks that are asked for.
+"""
+
+HELP = ("Usage: python run_history.py [--file=<history file>]\n"
+        "OPTIONAL: --trend (top and average score of every generation)\n"
+        "          --best=<genome file> (write the best genome of the run, for generate_sets.py)\n"
+        "          --lineage=<generation>:<member> (parents of a member, back to gen-0)")
+
+BLOCK_MAGIC = b'BSGEN001'
+# Magic, generation, members, genome bytes, members with sets, set lines, set digits.
+BLOCK_HEADER = '<8s6q'
+BLOCK_HEADER_SIZE = calcsize(BLOCK_HEADER)
+
+
+def padded(size):
+    """
+    param: Rounds a size up to whole 8-byte words, so every array in a block stays aligned.
+    type: int
+    return: int
+    """
+    return (size + 7) // 8 * 8
+
+
+def append_generation(generation, population, stats, parents, donors, set_members=(), sets=None,
+                      history_file=None):
+    """
+    param: Appends a generation block to the history file. stats are (count, total, total of squares) per member
+    (or None for a generation that was never assessed), parents and donors are member indices in the previous
+    generation (-1 for none) and sets holds the sets of the members listed in set_members.
+    type: int, list[Genome], list[(int, int, int)], list[int], list[int], list[int], numpy.ndarray, str
+    return: None
+    """
+    history_file = S.HISTORY_FILE if history_file is None else history_file
+    genomes = [genome.to_bytes() for genome in population]
+    offsets = zeros(len(genomes) + 1, dtype=int64)
+    offsets[1:] = array([len(genome) for genome in genomes], dtype=int64).cumsum()
+    genome_bytes = b''.join(genomes)
+    if stats is None:
+        stats = [(0, 0, 0)] * len(population)
+    set_members = asarray(set_members, dtype=int64)
+    sets = zeros((0, 0, 0), dtype=int64) if sets is None or len(set_members) == 0 else asarray(sets, dtype=int64)
+    block = [pack(BLOCK_HEADER, BLOCK_MAGIC, generation, len(population), len(genome_bytes), len(set_members),
+                  sets.shape[1], sets.shape[2]),
+             offsets.tobytes(), genome_bytes.ljust(padded(len(genome_bytes)), b'\0'),
+             array(stats, dtype=int64).reshape(len(population), 3).tobytes(),
+             asarray(parents, dtype=int64).tobytes(), asarray(donors, dtype=int64).tobytes(),
+             set_members.tobytes(), sets.tobytes()]
+    with open(history_file, 'ab') as history:
+        count('bytes_written', history.write(b''.join(block)))
+
+
+class RunHistory:
+    """
+    Read-only view of a history file. Blocks are found by walking their headers; a block cut short by an
+    interrupted run is ignored, and when a generation was written more than once (after --resume) the last one wins.
+    """
+
+    def __init__(self, history_file=None):
+        """
+        param: Memory-maps a history file and indexes its blocks.
+        type: str
+        return: None
+        """
+        history_file = S.HISTORY_FILE if history_file is None else history_file
+        self.data = memmap(history_file, dtype=uint8, mode='r') if path.getsize(history_file) else zeros(0, uint8)
+        self.blocks = {}
+        position = 0
+        while position + BLOCK_HEADER_SIZE <= len(self.data):
+            magic, generation, members, genome_size, set_members, set_lines, set_digits = unpack_from(
+                BLOCK_HEADER, self.data, position)
+            if magic != BLOCK_MAGIC:
+                break
+            block = {'members': members, 'start': position + BLOCK_HEADER_SIZE}
+            cursor = block['start']
+            for name, size in (('offsets', 8 * (members + 1)), ('genomes', padded(genome_size)),
+                               ('stats', 24 * members), ('parents', 8 * members), ('donors', 8 * members),
+                               ('set_members', 8 * set_members),
+                               ('sets', 8 * set_members * set_lines * set_digits)):
+                block[name] = cursor
+                cursor += size
+            if cursor > len(self.data):
+                break
+            block['sets_shape'] = (set_members, set_lines, set_digits)
+            self.blocks[generation] = block
+            position = cursor
+
+    def array(self, generation, name, count, shape=None):
+        """
+        param: A memory-mapped int64 array of a block, without copying it.
+        type: int, str, int, tuple
+        return: numpy.ndarray
+        """
+        start = self.blocks[generation][name]
+        view = self.data[start:start + 8 * count].view(int64)
+        return view if shape is None else view.reshape(shape)
+
+    def generations(self):
+        """
+        param: The generations in the history, in order.
+        type: None
+        return: list[int]
+        """
+        return sorted(self.blocks)
+
+    def stats(self, generation):
+        """
+        param: The (count, total, total of squares) of every member's set scores in a generation.
+        type: int
+        return: numpy.ndarray (int, members x 3)
+        """
+        members = self.blocks[generation]['members']
+        return self.array(generation, 'stats', 3 * members, (members, 3))
+
+    def scores(self, generation):
+        """
+        param: The mean score of every member of a generation, as they were ranked (0 when never assessed).
+        type: int
+        return: numpy.ndarray (int, members)
+        """
+        stats = self.stats(generation)
+        scores = zeros(len(stats), dtype=int64)
+        assessed = stats[:, 0] > 0
+        scores[assessed] = (stats[assessed, 1] / stats[assessed, 0]).astype(int64)
+        return scores
+
+    def score_trend(self):
+        """
+        param: The top and average score of every assessed generation.
+        type: None
+        return: list[(int, int, float)]
+        """
+        trend = []
+        for generation in self.generations():
+            if self.stats(generation)[:, 0].any():
+                scores = self.scores(generation)
+                trend.append((generation, int(scores.max()), float(scores.mean())))
+        return trend
+
+    def genome(self, generation, member):
+        """
+        param: A member's genome.
+        type: int, int
+        return: Genome
+        """
+        offsets = self.array(generation, 'offsets', self.blocks[generation]['members'] + 1)
+        start = self.blocks[generation]['genomes']
+        return Genome.from_bytes(self.data[start:start + int(offsets[-1])].tobytes(), int(offsets[member]))
+
+    def best_genome(self):
+        """
+        param: The best scoring member of the whole run.
+        type: None
+        return: (int, int, int, Genome) generation, member, score, genome; or None if nothing was assessed
+        """
+        best = None
+        for generation in self.generations():
+            scores = self.scores(generation)
+            if len(scores) and (best is None or scores.max() > best[2]):
+                best = (generation, int(scores.argmax()), int(scores.max()))
+        if best is None:
+            return None
+        return best + (self.genome(best[0], best[1]),)
+
+    def lineage(self, generation, member):
+        """
+        param: Follows a member's parents back through the generations, until a member that was created randomly.
+        type: int, int
+        return: list[(int, int, int)] generation, member and crossover donor (-1 for none), newest first
+        """
+        line = []
+        while generation in self.blocks and member >= 0:
+            members = self.blocks[generation]['members']
+            donor = int(self.array(generation, 'donors', members)[member])
+            line.append((generation, member, donor))
+            member = int(self.array(generation, 'parents', members)[member])
+            generation -= 1
+        return line
+
+    def sets(self, generation, member):
+        """
+        param: The raw sets of a member, if the retention policy kept them.
+        type: int, int
+        return: numpy.ndarray (int, lines x digits) or None
+        """
+        set_members, set_lines, set_digits = self.blocks[generation]['sets_shape']
+        members = self.array(generation, 'set_members', set_members).tolist()
+        if member not in members:
+            return None
+        return self.array(generation, 'sets', set_members * set_lines * set_digits,
+                          (set_members, set_lines, set_digits))[members.index(member)]
+
+
+def main():
+    if len(argv) < 2 or "--help" in argv:
+        print(HELP)
+        return
+
+    history_file = S.HISTORY_FILE
+    for arg in argv[1:]:
+        if "--file=" in arg:
+            history_file = arg.split("=")[1]
+    if not path.exists(history_file):
+        print("File does not exist: ", history_file)
+        return
+    history = RunHistory(history_file)
+
+    for arg in argv[1:]:
+        if arg == "--trend":
+            for generation, top_score, average_score in history.score_trend():
+                print(str(generation) + ": top " + str(top_score) + " average " + str(average_score))
+        elif "--best=" in arg:
+            best = history.best_genome()
+            if best is None:
+                print("Nothing was assessed yet.")
+                return
+            with open(arg.split("=")[1], 'wb') as genome_file:
+                genome_file.write(best[3].to_bytes())
+            print("Generation " + str(best[0]) + " member " + str(best[1]) + " scored " + str(best[2]))
+        elif "--lineage=" in arg:
+            generation, member = arg.split("=")[1].split(":")
+            for generation, member, donor in history.lineage(int(generation), int(member)):
+                print(str(generation) + ":" + str(member) + ("" if donor < 0 else " (crossed with " +
+                                                             str(generation - 1) + ":" + str(donor) + ")"))
+        elif "--file=" not in arg:
+            print(HELP)
+            return
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+from collections import Counter
+from time import perf_counter, process_time
+
+from numpy import array
+from numpy.linalg import lstsq
+
+from genome import Genome, as_dna
+from metrics import SamplingProfiler, add_counters, count, take_counters
+import settings as S
+
+
+def task_features(dna=None, size=1):
+    """
+    param: What a task's cost is estimated from: letters and key slots times the sets it creates, plus one for the
+    fixed cost of any task. Tasks without a DNA yet (generating one) only have the fixed part.
+    type: Genome or list[str,...,[int]], int
+    return: list[float]
+    """
+    if dna is None:
+        return [0.0, 0.0, 1.0]
+    if isinstance(dna, Genome):
+        letters, keys = len(dna.letters), len(dna.key)
+    else:
+        dna = as_dna(dna)
+        letters, keys = len(dna) // 2, len(dna[-1])
+    return [float(letters * size), float(keys * size), 1.0]
+
+
+def run_chunk(function, indexed_tasks, stage='', profile=None):
+    """
+    param: Worker side of the scheduler: runs a chunk of tasks and times each one. A failing task is reported
+    with its index instead of being lost. The counters the tasks counted (see metrics.py) go back with the results,
+    and so do the samples of a sampling profiler when profile gives its interval.
+    type: function, list[(int, tuple)], str, float
+    return: list[(int, object, float)] index, result and seconds of every task, dict (counters),
+    Counter (profile samples) or None
+    """
+    done = []
+    profiler = None if profile is None else SamplingProfiler(profile)
+    if profiler is not None:
+        profiler.start()
+    cpu = process_time()
+    try:
+        for index, task in indexed_tasks:
+            start = perf_counter()
+            try:
+                result = function(*task)
+            except Exception as error:
+                raise RuntimeError("Task " + str(index) + " of " + function.__name__ + " failed: " +
+                                   repr(error)) from error
+            done.append((index, result, perf_counter() - start))
+    finally:
+        samples = None if profiler is None else profiler.stop()
+    count(stage + '_worker_cpu_seconds', process_time() - cpu)
+    return done, take_counters(), samples
+
+
+class Scheduler:
+    """
+    Runs the tasks of a stage on the pool, longest first, in chunks that shrink as the stage runs out of work,
+    and learns from the time every task really took (a least squares fit per stage over task_features).
+    While profile holds a sampling interval, the workers profile their chunks and the samples add up in samples.
+    """
+
+    def __init__(self, pool, processes):
+        """
+        param: Wraps a pool that has `processes` workers.
+        type: Pool, int
+        return: None
+        """
+        self.pool = pool
+        self.processes = processes
+        self.observations = {}
+        self.profile = None
+        self.samples = Counter()
+
+    def estimate(self, stage, features):
+        """
+        param: Estimated seconds of every task of a stage. Before anything was observed, the cost is just the
+        size of the features.
+        type: str, list[list[float]]
+        return: numpy.ndarray (float, tasks)
+        """
+        features = array(features, dtype=float).reshape(-1, 3)
+        if not self.learned(stage):
+            return features.sum(axis=1)
+        known_features, seconds = self.observations[stage]
+        weights = lstsq(array(known_features), array(seconds), rcond=None)[0]
+        return (features @ weights).clip(1e-6)
+
+    def learned(self, stage):
+        """
+        param: Whether enough tasks of a stage were timed for estimates in seconds.
+        type: str
+        return: bool
+        """
+        return stage in self.observations and len(self.observations[stage][0]) >= 3
+
+    def record(self, stage, features, seconds):
+        """
+        param: Remembers the time a task really took, keeping the newest SCHEDULE_HISTORY of each stage.
+        type: str, list[float], float
+        return: None
+        """
+        known_features, known_seconds = self.observations.setdefault(stage, ([], []))
+        known_features.append(features)
+        known_seconds.append(seconds)
+        del known_features[:-S.SCHEDULE_HISTORY], known_seconds[:-S.SCHEDULE_HISTORY]
+
+    def map(self, stage, function, tasks, features):
+        """
+        param: Runs function(*task) for every task and returns the results in task order. Tasks go out longest
+        first; every chunk holds about 1 / (SCHEDULE_CHUNK_FACTOR * processes) of the estimated work still left,
+        and at least SCHEDULE_MIN_CHUNK seconds of it so small tasks don't pay for a round trip each.
+        Results are collected as soon as any worker is done with a chunk.
+        type: str, function, list[tuple], list[list[float]]
+        return: list
+        """
+        if not tasks:
+            return []
+        costs = self.estimate(stage, features)
+        order = sorted(range(len(tasks)), key=lambda index: -costs[index])
+        remaining = float(costs.sum())
+        learned = self.learned(stage)
+        chunks = []
+        chunk = []
+        chunk_cost = 0.0
+        for index in order:
+            chunk.append((index, tasks[index]))
+            chunk_cost += costs[index]
+            target = remaining / (S.SCHEDULE_CHUNK_FACTOR * self.processes)
+            if learned:
+                target = max(target, S.SCHEDULE_MIN_CHUNK)
+            if chunk_cost >= target:
+                chunks.append(chunk)
+                remaining -= chunk_cost
+                chunk = []
+                chunk_cost = 0.0
+        if chunk:
+            chunks.append(chunk)
+        results = [None] * len(tasks)
+        for done, counters, samples in self.pool.imap_unordered(
+                _run_chunk, [(function, chunk, stage, self.profile) for chunk in chunks]):
+            add_counters(counters)
+            if samples is not None:
+                self.samples.update(samples)
+            for index, result, seconds in done:
+                results[index] = result
+                self.record(stage, features[index], seconds)
+        return results
+
+
+def _run_chunk(arguments):
+    return run_chunk(*arguments)
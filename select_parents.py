@@ -0,0 +1,46 @@
+from numpy import arange, asarray, log, sort
+
+from get_top_scores import get_top_scores
+from random_streams import get_stream
+import settings as S
+
+
+def rank_weights(count, method):
+    """
+    param: Selection weights by rank (best first) for the sampling methods.
+    type: int, str
+    return: numpy.ndarray (float, count)
+    """
+    ranks = arange(count)
+    if method == 'rank':
+        weights = (count - ranks).astype(float)
+    elif method == 'logarithmic':
+        weights = log((count + 1) / (ranks + 1))
+    else:
+        raise ValueError("Unknown selection method: " + str(method))
+    return weights / weights.sum()
+
+
+def select_parents(dna_scores, count=None, method=None, rng=None):
+    """
+    param: Picks the DNAs that ascend to the next generation, best first. 'top' takes the best `count`, 'rank' and
+    'logarithmic' draw `count` parents with weights that fall off linearly or logarithmically with the rank, and
+    'tournament' takes the best of TOURNAMENT_SIZE random members `count` times. Sampled parents can repeat.
+    type: list[int] or numpy.ndarray, int, str, numpy.random.Generator
+    return: list[int]
+    """
+    dna_scores = asarray(dna_scores)
+    if count is None:
+        count = max(1, S.ASCENDING * len(dna_scores) // 100)
+    method = S.SELECTION if method is None else method
+    if method == 'top':
+        return get_top_scores(dna_scores, count)
+    if rng is None:
+        rng = get_stream().generator
+    order = asarray(get_top_scores(dna_scores, len(dna_scores)))
+    # Everything below works on ranks, so ties are broken the same way get_top_scores breaks them.
+    if method == 'tournament':
+        ranks = rng.integers(0, len(order), size=(count, S.TOURNAMENT_SIZE)).min(axis=1)
+    else:
+        ranks = rng.choice(len(order), size=count, p=rank_weights(len(order), method))
+    return order[sort(ranks)].tolist()
@@ -26,7 +26,10 @@ OPERATORS = [
 
 RANDOM_CHANCE = 15           # % out of 100 would be random letter in the "DNA" and the rest are constant.
 MINIMUM_LETTER_VALUE = 1     # Minimum value of a letter.
-MAXIMUM_LETTER_VALUE = 7     # Maximum value of a letter.
+MAXIMUM_LETTER_VALUE = 7     # Maximum value of a letter. Letters are stored as bytes, so keep both within 0..255.
+BATCH_EVALUATION = True      # Draw and evaluate all of a DNA's digits at once with NumPy instead of one by one.
+DISTRIBUTION_SAMPLING = True # Work out a DNA's exact digit distribution once and sample sets from it instead.
+DISTRIBUTION_MAX_STATES = 100000  # Letter combinations or outcomes above which the distribution isn't worked out.
 
 # HEALTH checks:
 """
@@ -43,14 +46,37 @@ But that 1 out of 5 is a number outside the range, so we deleted that DNA... A s
 always bad.
 """
 SET_HEALTH = 1950
-GEN_FOLDER = "generation-"   # The folder name for each generation.
+VALIDITY_CHUNK = 100         # Health is checked in chunks of this many tests, a DNA stops once it can't pass anymore.
+VALIDITY_SPRT = False        # Also accept or reject DNAs early with a sequential probability ratio test.
+VALIDITY_ERROR_RATE = 0.01   # How often the sequential test may wrongly accept or wrongly reject a DNA.
+VALIDITY_SPRT_RATIO = 2      # The test tells apart miss rates this many times below and above the allowed one.
+HISTORY_FILE = "history.bin" # Every generation's genomes, scores and lineage, appended to one file (run_history.py).
+HISTORY_SETS = 'best'        # Raw sets kept in the history: 'none', 'best' (the top member's) or 'all'.
+HISTORY_SETS_EVERY = 10      # Sets are only kept every N generations, and for the last generation.
+CHECKPOINT_FOLDER = "checkpoints"  # Where every assessed generation is saved for better.py --resume.
+CHECKPOINT_KEEP = 2          # How many of the newest checkpoints are kept.
+FITNESS_CACHE_SIZE = 10000   # How many genomes' scores are remembered, so unchanged survivors aren't rescored.
+FITNESS_CACHE_TOP_UP = 0     # Sets added to a remembered genome's score each time it comes back (0: just reuse).
+FITNESS_CACHE_FILE = None    # File the remembered scores are kept in between runs (None: memory only).
+RACING = False               # Give every DNA a few sets first and only keep assessing the ones near the cut.
+RACE_INITIAL_SETS = 100      # Sets every DNA gets in the first round of a race, doubled every round after.
+RACE_CONFIDENCE = 2.0        # How many standard errors apart two DNAs must be before the race tells them apart.
+"""
+A race leaves the DNAs that are clearly above or below the cut with fewer than SET_SIZE sets. Those partial scores
+are cached too: a later race picks them up where they stopped, a run without RACING assesses them up to SET_SIZE.
+HISTORY_SETS only keeps the sets of DNAs that got all SET_SIZE sets in the generation, which under RACING are
+usually just the DNAs close to the cut, so often none at all.
+"""
 TEST_FILE = "./test.csv"       # The file that contains the test sets.
+SUBSTRING_MATCH = False      # Compatibility: True matches digits anywhere in a test line ("1" in "10") like old runs.
 
 
 """
 Parameters for generational changes:
 """
 ASCENDING = 75               # Percentage of top DNAs that are taken from the previous generation.
+SELECTION = 'top'            # How they are picked: 'top', 'rank', 'logarithmic' or 'tournament' (see select_parents).
+TOURNAMENT_SIZE = 3          # How many DNAs compete for every pick in 'tournament' selection.
 DNA_MUTATION_RATE = 1        # Percentage of the DNA that is mutated.
 DNA_MIX_RATE = 10            # Percentage of the DNAs that mix together (sort of sexual reproduction).
 DNA_DUPLICATION_RATE = 1     # Percentage of the DNAs that will have some of their instructions duplicated.
@@ -64,7 +90,47 @@ The length is a pair of a number (letter) plus an operator.
 CHANGE_MIN_LENGTH = 1        # Minimum length of pairs to change.
 CHANGE_MAX_LENGTH = 3        # Maximum length of pairs to change.
 
+"""
+Island mode (better.py --islands=N): populations that evolve apart and swap their best DNAs now and then.
+"""
+MIGRATION_EVERY = 5          # Islands swap migrants every N generations.
+MIGRANTS = 2                 # How many of its top DNAs an island sends each time.
+ISLAND_PORT = 6543           # Port of the coordinator when it runs on this host.
+ISLAND_AUTHKEY = None        # Shared secret of islands and coordinator (None: --authkey= or BETTER_ISLAND_AUTHKEY).
+ISLAND_CONNECT_TIMEOUT = 30  # Seconds an island keeps trying to reach the coordinator, and has to say hello in.
+
 """
 Free threads  that are kept for other operations. This is used so that the code won't choke the CPU.
 """
 FREE_THREADS = 3
+
+"""
+Metrics and profiling. With a METRICS_FILE, every generation writes the wall and CPU time of its stages and its
+counters (DNAs generated, is_valid rejections, sets assessed, fitness cache hits, bytes written...) there, as
+JSON lines or, with METRICS_FORMAT = 'prometheus', as a Prometheus text file replaced every generation.
+PROFILE_GENERATION samples the call stacks of the parent and the workers during that one generation and writes
+them to PROFILE_FILE in the folded format flame graph tools read.
+"""
+QUIET = False                # Don't print a line for every member.
+METRICS_FILE = None
+METRICS_FORMAT = 'jsonl'     # 'jsonl' or 'prometheus'.
+PROFILE_GENERATION = None
+PROFILE_INTERVAL = 0.005     # Seconds of CPU time between samples.
+PROFILE_FILE = "profile.txt"
+
+"""
+Random streams. Every task draws from its own stream, spawned from SEED (fresh entropy when None) and from the
+stage, generation and member the task belongs to, so a run with a SEED can be repeated exactly on any number of
+cores. Small random integers are drawn RANDOM_BUFFER at a time and served from a buffer.
+"""
+SEED = None
+RANDOM_BUFFER = 4096
+
+"""
+Task scheduling. Tasks are sent to the workers longest first, in chunks that hold about
+1 / (SCHEDULE_CHUNK_FACTOR * workers) of the estimated work still left. The estimates are fitted to the time the
+last SCHEDULE_HISTORY tasks of each stage really took.
+"""
+SCHEDULE_CHUNK_FACTOR = 2
+SCHEDULE_MIN_CHUNK = 0.05  # Seconds of estimated work a chunk holds at least, so tiny tasks share a round trip.
+SCHEDULE_HISTORY = 1000
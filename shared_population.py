@@ -0,0 +1,169 @@
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from numpy import cumsum, frombuffer, int64, ndarray, uint8, zeros
+
+from genome import Genome
+import settings as S
+
+"""
+The population of the generation being assessed, in shared memory: the workers read the genomes and write the
+set scores in place, so neither travels through the pool's pipes. A block holds a header (members, score columns,
+genome bytes), the offsets table of the packed genomes, a score row per member and the genomes themselves.
+The parent keeps two blocks and fills the idle one with every new generation, then swaps them.
+"""
+
+HEADER_SIZE = 3
+
+# Blocks this worker is attached to, by name.
+_ATTACHED = {}
+
+
+def block_arrays(buffer):
+    """
+    param: The arrays a block's memory is divided into.
+    type: memoryview
+    return: numpy.ndarray (int, members + 1) offsets, numpy.ndarray (int, members x columns) scores,
+    numpy.ndarray (uint8) genome bytes
+    """
+    header = ndarray((HEADER_SIZE,), dtype=int64, buffer=buffer)
+    members, columns, genome_bytes = header.tolist()
+    position = HEADER_SIZE * 8
+    offsets = ndarray((members + 1,), dtype=int64, buffer=buffer, offset=position)
+    position += (members + 1) * 8
+    scores = ndarray((members, columns), dtype=int64, buffer=buffer, offset=position)
+    position += members * columns * 8
+    genomes = ndarray((genome_bytes,), dtype=uint8, buffer=buffer, offset=position)
+    return offsets, scores, genomes
+
+
+def score_columns():
+    """
+    param: How many scores a member can get in one evaluation: SET_SIZE, or more for a big FITNESS_CACHE_TOP_UP.
+    type: None
+    return: int
+    """
+    return max(S.SET_SIZE, S.FITNESS_CACHE_TOP_UP)
+
+
+class SharedPopulation:
+    """
+    Parent side of the shared population: two shared memory blocks, one holding the generation being assessed.
+    Make it before the worker pool: the workers then share the parent's resource tracker, instead of starting
+    their own that would unlink the blocks when a worker exits.
+    """
+
+    def __init__(self):
+        """
+        param: Starts without blocks, they are made by the first publish().
+        type: None
+        return: None
+        """
+        self.blocks = [None, None]
+        self.current = 0
+        resource_tracker.ensure_running()
+
+    def publish(self, population):
+        """
+        param: Writes a generation into the idle block and makes it the current one. A block that is too small
+        for the generation is replaced by a bigger one.
+        type: list[Genome]
+        return: None
+        """
+        genomes = [genome.to_bytes() for genome in population]
+        offsets = zeros(len(genomes) + 1, dtype=int64)
+        offsets[1:] = cumsum([len(genome) for genome in genomes])
+        columns = score_columns()
+        size = (HEADER_SIZE + len(offsets) + len(genomes) * columns) * 8 + int(offsets[-1])
+        idle = 1 - self.current
+        if self.blocks[idle] is None or self.blocks[idle].size < size:
+            self.release(idle)
+            # Some room to grow, so a slightly longer generation doesn't need a new block.
+            self.blocks[idle] = SharedMemory(create=True, size=size + size // 4)
+        header = ndarray((HEADER_SIZE,), dtype=int64, buffer=self.blocks[idle].buf)
+        header[:] = (len(genomes), columns, int(offsets[-1]))
+        block_offsets, scores, genome_bytes = block_arrays(self.blocks[idle].buf)
+        block_offsets[:] = offsets
+        scores[:] = 0
+        genome_bytes[:] = frombuffer(b''.join(genomes), dtype=uint8)
+        self.current = idle
+
+    @property
+    def name(self):
+        """
+        param: The name workers attach to the current block with.
+        type: None
+        return: str
+        """
+        return self.blocks[self.current].name
+
+    @property
+    def scores(self):
+        """
+        param: The score rows of the current block.
+        type: None
+        return: numpy.ndarray (int, members x columns)
+        """
+        return block_arrays(self.blocks[self.current].buf)[1]
+
+    def release(self, index):
+        """
+        param: Frees one of the blocks.
+        type: int
+        return: None
+        """
+        if self.blocks[index] is not None:
+            self.blocks[index].close()
+            self.blocks[index].unlink()
+            self.blocks[index] = None
+
+    def close(self):
+        """
+        param: Frees both blocks.
+        type: None
+        return: None
+        """
+        self.release(0)
+        self.release(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def attach(name):
+    """
+    param: Worker side: the arrays of a block, attaching to it the first time. The arrays are laid out again on
+    every call, since the parent reuses a block for later generations. Workers stay attached to the two newest
+    blocks only.
+    type: str
+    return: numpy.ndarray (int) offsets, numpy.ndarray (int) scores, numpy.ndarray (uint8) genome bytes
+    """
+    if name not in _ATTACHED:
+        while len(_ATTACHED) >= 2:
+            old_name = next(iter(_ATTACHED))
+            _ATTACHED.pop(old_name).close()
+        _ATTACHED[name] = SharedMemory(name=name)
+    return block_arrays(_ATTACHED[name].buf)
+
+
+def read_genome(name, member):
+    """
+    param: Worker side: a member's genome, straight from the block.
+    type: str, int
+    return: Genome
+    """
+    offsets, scores, genomes = attach(name)
+    return Genome.from_bytes(genomes[offsets[member]:offsets[member + 1]].tobytes())
+
+
+def write_scores(name, member, column, set_scores):
+    """
+    param: Worker side: writes a member's set scores into its row, starting at column.
+    type: str, int, int, numpy.ndarray
+    return: None
+    """
+    scores = attach(name)[1]
+    scores[member, column:column + len(set_scores)] = set_scores
@@ -0,0 +1,61 @@
+from numpy import zeros, int64
+
+import settings as S
+
+# Indexes already built in this process, by test file and matching mode.
+_TEST_INDEXES = {}
+
+
+def load_test_index(test_file=None, substring=None):
+    """
+    param: Reads the test file once and counts, for every digit between MINIMUM_DIGIT and MAXIMUM_DIGIT, how many
+    test lines contain it. With substring=True a digit matches anywhere in the line text ("1" matches "10"),
+    which is how sets were scored before; otherwise it has to be one of the line's comma separated values.
+    type: str, bool
+    return: numpy.ndarray (int, MAXIMUM_DIGIT + 1)
+    """
+    if test_file is None:
+        test_file = S.TEST_FILE
+    if substring is None:
+        substring = S.SUBSTRING_MATCH
+    test_index = zeros(S.MAXIMUM_DIGIT + 1, dtype=int64)
+    with open(test_file, 'r') as test_file_handle:
+        for test_set in test_file_handle:
+            if not substring:
+                tokens = set(token.strip() for token in test_set.split(','))
+            for digit in range(S.MINIMUM_DIGIT, S.MAXIMUM_DIGIT + 1):
+                if substring and str(digit) in test_set:
+                    test_index[digit] += 1
+                elif not substring and str(digit) in tokens:
+                    test_index[digit] += 1
+    test_file_handle.close()
+    return test_index
+
+
+def get_test_index(test_file=None, substring=None):
+    """
+    param: Returns the index of a test file, building it only the first time it is asked for in this process.
+    type: str, bool
+    return: numpy.ndarray (int, MAXIMUM_DIGIT + 1)
+    """
+    if test_file is None:
+        test_file = S.TEST_FILE
+    if substring is None:
+        substring = S.SUBSTRING_MATCH
+    if (test_file, substring) not in _TEST_INDEXES:
+        _TEST_INDEXES[(test_file, substring)] = load_test_index(test_file, substring)
+    return _TEST_INDEXES[(test_file, substring)]
+
+
+def share_test_index(test_index, test_file=None, substring=None):
+    """
+    param: Pool initializer: hands a worker the index the parent already built, so workers never read the test file.
+    type: numpy.ndarray, str, bool
+    return: None
+    """
+    if test_file is None:
+        test_file = S.TEST_FILE
+    if substring is None:
+        substring = S.SUBSTRING_MATCH
+    test_index.setflags(write=False)
+    _TEST_INDEXES[(test_file, substring)] = test_index
@@ -0,0 +1,122 @@
+from numpy.random import default_rng
+
+from breed_population import breed_population
+from genome import Genome, is_letter
+import settings as S
+
+"""
+Regression tests for the batched breeding operators: duplication copies a whole run of pairs (a letter and the
+operator after it) in front of itself, reduction cuts one out leaving at least two letters, the key flags stay on
+the letters they were on, and every child is a well-formed genome.
+"""
+
+SEED = 2012
+MEMBERS = 200
+
+
+def random_population(rng):
+    """
+    param: Genomes of 1 to 30 letters, so the shortest ones hit the clipping of the pair counts, with random
+    key slots.
+    type: numpy.random.Generator
+    return: list[Genome]
+    """
+    population = []
+    for member in range(MEMBERS):
+        letters = int(rng.integers(1, 31))
+        tokens = []
+        for letter in range(letters):
+            if letter:
+                tokens.append(S.OPERATORS[int(rng.integers(len(S.OPERATORS)))])
+            tokens.append(str(rng.integers(S.MINIMUM_LETTER_VALUE, S.MAXIMUM_LETTER_VALUE, endpoint=True)))
+        key = sorted(set(2 * int(index) for index in rng.integers(0, letters, size=int(rng.integers(0, 6)))))
+        population.append(Genome.from_dna(tokens + [key]))
+    return population
+
+
+def pairs_model(genome):
+    """
+    param: A genome as a list of [letter, operator after it (None for the last letter), is key slot].
+    type: Genome
+    return: list[[int, str, bool]]
+    """
+    operators = [S.OPERATORS[code] for code in genome.operator_codes()] + [None]
+    return [[letter, operator, position in genome.key]
+            for position, (letter, operator) in enumerate(zip(genome.letters, operators))]
+
+
+def expected_children(population, parents, seed):
+    """
+    param: What duplication and reduction should make of every parent, replaying the draws breed_population
+    makes first: the operator rolls, the positions and the pair counts.
+    type: list[Genome], list[int], int
+    return: list[list[[int, str, bool]]], list[int] (length changes)
+    """
+    rng = default_rng(seed)
+    rng.random((4, len(parents)))
+    positions = rng.random((5, len(parents)))
+    pairs = rng.integers(S.CHANGE_MIN_LENGTH, S.CHANGE_MAX_LENGTH, size=(2, len(parents)))
+    children = []
+    changes = []
+    for child, parent in enumerate(parents):
+        model = pairs_model(population[parent])
+        duplicated = min(int(pairs[0][child]), len(model) - 1)
+        start = int(positions[1][child] * (len(model) - duplicated))
+        model = model[:start + duplicated] + [list(pair) for pair in model[start:]]
+        removed = max(min(int(pairs[1][child]), len(model) - 2), 0)
+        start = int(positions[2][child] * (len(model) - removed))
+        model = model[:start] + model[start + removed:]
+        # Whatever comes last has no operator after it, whichever pair it came from.
+        children.append([[letter, operator, is_slot] for letter, operator, is_slot in model[:-1]] +
+                        [[model[-1][0], None, model[-1][2]]])
+        changes.append(duplicated - removed)
+    return children, changes
+
+
+def check_well_formed(child):
+    """
+    param: Asserts a child alternates letters and operators, its key points at letters and it round-trips through
+    the DNA list and the binary encoding.
+    type: Genome
+    return: None
+    """
+    dna = child.to_dna()
+    tokens = dna[:-1]
+    assert len(tokens) % 2 == 1
+    assert all(is_letter(token) if index % 2 == 0 else token in S.OPERATORS for index, token in enumerate(tokens))
+    assert all(index % 2 == 0 and index < len(tokens) for index in dna[-1])
+    assert Genome.from_dna(dna) == child
+    assert Genome.from_bytes(child.to_bytes()) == child
+
+
+def test_breeding_keeps_genomes_well_formed(monkeypatch):
+    for name in ('DNA_MUTATION_RATE', 'DNA_DUPLICATION_RATE', 'DNA_REDUCTION_RATE', 'DNA_MIX_RATE'):
+        monkeypatch.setattr(S, name, 100)
+    population = random_population(default_rng(SEED))
+    parents = default_rng(SEED + 1).integers(0, MEMBERS, size=MEMBERS).tolist()
+    children, donors = breed_population(population, parents, default_rng(SEED))
+    expected, changes = expected_children(population, parents, SEED)
+    assert len(children) == len(parents)
+    for child, parent, model, change in zip(children, parents, expected, changes):
+        check_well_formed(child)
+        assert len(child) == len(population[parent]) + change
+        # Mutation and crossover change letters and operators but never move a key flag.
+        assert [position for position, pair in enumerate(model) if pair[2]] == list(child.key)
+    assert all(donor != -1 for donor in donors)
+
+
+def test_duplication_and_reduction_move_whole_pairs(monkeypatch):
+    monkeypatch.setattr(S, 'DNA_MUTATION_RATE', 0)
+    monkeypatch.setattr(S, 'DNA_MIX_RATE', 0)
+    monkeypatch.setattr(S, 'DNA_DUPLICATION_RATE', 100)
+    monkeypatch.setattr(S, 'DNA_REDUCTION_RATE', 100)
+    population = random_population(default_rng(SEED))
+    parents = list(range(MEMBERS))
+    children, donors = breed_population(population, parents, default_rng(SEED))
+    expected, changes = expected_children(population, parents, SEED)
+    assert any(change != 0 for change in changes)
+    for child, model in zip(children, expected):
+        check_well_formed(child)
+        # Every letter keeps its operator and its key flag.
+        assert pairs_model(child) == model
+    assert donors == [-1] * MEMBERS
@@ -0,0 +1,109 @@
+from numpy import allclose, array_equal, int64, rint
+from numpy.random import default_rng
+
+from batch_digits import evaluate_plan, plan_dna
+from compile_dna import compile_expression
+from dna_distribution import build_distribution
+from fitness_cache import genome_hash
+from fold_dna import evaluate_folded, fold_plan
+import settings as S
+
+"""
+Regression tests for the evaluators that stand in for eval: the compiled expression, the plan and the folded plan
+must give the digits eval gives for every draw, and DNAs with the same canonical form (the fitness cache key)
+must have the same digit distribution.
+"""
+
+SEED = 2022
+DNAS = 400
+DRAWS = 64
+
+
+def random_dna(rng):
+    """
+    param: A DNA of up to 12 letters (constants from 0 to 12, so zeros and two-digit letters show up) with up to
+    4 key slots, repeats included.
+    type: numpy.random.Generator
+    return: list[str,...,[int]]
+    """
+    letters = int(rng.integers(1, 13))
+    tokens = []
+    for letter in range(letters):
+        if letter:
+            tokens.append(S.OPERATORS[int(rng.integers(len(S.OPERATORS)))])
+        tokens.append(str(rng.integers(0, 13)))
+    return tokens + [[2 * int(index) for index in rng.integers(0, letters, size=int(rng.integers(0, 5)))]]
+
+
+def eval_dna(dna, row):
+    """
+    param: The reference: a DNA with the drawn letters put in its key slots, through eval.
+    type: list[str,...,[int]], list[int]
+    return: float
+    """
+    tokens = list(dna[:-1])
+    for index, letter in zip(dna[-1], row):
+        tokens[index] = str(letter)
+    return eval(''.join(tokens))
+
+
+def test_evaluators_match_eval():
+    rng = default_rng(SEED)
+    planned = 0
+    for dna in (random_dna(rng) for case in range(DNAS)):
+        plan = plan_dna(dna)
+        if plan is None:
+            continue
+        planned += 1
+        letters = rng.integers(S.MINIMUM_LETTER_VALUE, S.MAXIMUM_LETTER_VALUE, size=(DRAWS, len(dna[-1])),
+                               endpoint=True)
+        expected = [round(eval_dna(dna, row)) for row in letters.tolist()]
+        expression = compile_expression(dna)
+        assert [round(expression(*row)) for row in letters.tolist()] == expected, dna
+        assert rint(evaluate_plan(plan, letters)).astype(int64).tolist() == expected, dna
+        assert rint(evaluate_folded(fold_plan(plan), letters)).astype(int64).tolist() == expected, dna
+    assert planned > DNAS // 2
+
+
+def write_dna(terms, key_order):
+    """
+    param: Writes a sum of products as a DNA, its key slots listed in key_order.
+    type: list[(str, list[(str, bool)])] (sign, factors as (letter, is key slot)), list[int]
+    return: list[str,...,[int]]
+    """
+    tokens = []
+    slots = []
+    for position, (sign, factors) in enumerate(terms):
+        if position:
+            tokens.append(sign)
+        for factor, (letter, is_slot) in enumerate(factors):
+            if factor:
+                tokens.append('*')
+            if is_slot:
+                slots.append(len(tokens))
+            tokens.append(letter)
+    return tokens + [[slots[index] for index in key_order]]
+
+
+def test_canonical_form_keys_the_distribution():
+    rng = default_rng(SEED)
+    for case in range(50):
+        terms = [('+' if term == 0 or rng.random() < 0.6 else '-',
+                  [(str(rng.integers(1, 10)), bool(rng.random() < 0.4)) for factor in range(int(rng.integers(1, 4)))])
+                 for term in range(int(rng.integers(2, 6)))]
+        slots = sum(is_slot for sign, factors in terms for letter, is_slot in factors)
+        dna = write_dna(terms, list(range(slots)))
+        # The same sum with its terms, factors and key columns in another order.
+        shuffled = [(sign, [factors[index] for index in rng.permutation(len(factors))])
+                    for sign, factors in (terms[index] for index in rng.permutation(len(terms)))]
+        shuffled.sort(key=lambda term: term[0] != '+')
+        reordered = write_dna(shuffled, rng.permutation(slots).tolist())
+        assert genome_hash(dna) == genome_hash(reordered), (dna, reordered)
+        digits, probabilities = build_distribution(dna)
+        reordered_digits, reordered_probabilities = build_distribution(reordered)
+        assert array_equal(digits, reordered_digits)
+        assert allclose(probabilities, reordered_probabilities)
+        # Making a key slot constant changes what the DNA generates, and its key.
+        if slots:
+            fixed = write_dna([(sign, [(letter, False) for letter, is_slot in factors]) for sign, factors in terms], [])
+            assert genome_hash(fixed) != genome_hash(dna)